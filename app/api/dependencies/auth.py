@@ -9,13 +9,12 @@ file that was distributed with this source code.
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from jose.exceptions import JWTError
 
-from app.core.config import SECRET_KEY
 from app.models.domain.user import User
 from app.resources import strings
-from app.services.jwt import ALGORITHM
-from app.services.magtifun import check_auth_key
+from app.services.jwt import decode_access_token, is_token_trusted
+from app.services.magtifun import check_auth_key, open_page_memo
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -24,6 +23,9 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     """
     Load user from JWT token.
 
+    The Authentication Key is checked upstream unless the token is within
+    JWT_TRUST_WINDOW seconds of being issued.
+
     :param str token: JWT user.
     :raises HTTPException: if unable to get user from given JWT.
     :return: User.
@@ -35,10 +37,12 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+    open_page_memo()
+
     try:
-        payload = jwt.decode(token, str(SECRET_KEY), algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         key: str = payload.get("sub")
-        if key is None or not check_auth_key(key):
+        if key is None or not (is_token_trusted(payload) or await check_auth_key(key)):
             raise credentials_exception
 
         return User(key=key)
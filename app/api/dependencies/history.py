@@ -0,0 +1,26 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from fastapi import Query
+
+
+@dataclass
+class HistoryWindow:
+    """
+    Part of a history to return, from the limit, since and until query
+    parameters.
+    """
+
+    limit: Optional[int] = Query(None, ge=1)
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
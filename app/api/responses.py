@@ -0,0 +1,83 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+import hashlib
+import json
+from datetime import datetime
+from typing import Any
+
+from fastapi import Request, Response, status
+from fastapi.encoders import jsonable_encoder
+
+
+def json_body(content: Any) -> bytes:
+    """
+    Render content as compact UTF-8 JSON.
+
+    History rows, alone or in a list, are rendered from their fields
+    directly instead of being validated into response models again.
+
+    :param Any content: Response content.
+    :return: JSON.
+    """
+
+    if _is_row(content):
+        content = content._asdict()
+    elif isinstance(content, list) and content and _is_row(content[0]):
+        content = [row._asdict() for row in content]
+    else:
+        content = jsonable_encoder(content)
+
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def json_response(content: Any) -> Response:
+    """
+    Render JSON response, see json_body.
+
+    :param Any content: Response content.
+    :return: Response.
+    """
+
+    return Response(content=json_body(content), media_type="application/json")
+
+
+def etag_response(request: Request, content: Any) -> Response:
+    """
+    Render JSON response with ETag, or 304 when the client copy is current.
+
+    :param Request request: Current request.
+    :param Any content: Response content.
+    :return: Response.
+    """
+
+    body = json_body(content)
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    headers = {"ETag": etag}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip().replace("W/", "", 1) for tag in if_none_match.split(",")]
+        if "*" in tags or etag in tags:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _is_row(value: Any) -> bool:
+    return isinstance(value, tuple) and hasattr(value, "_asdict")
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
@@ -7,9 +7,10 @@ For the full copyright and license information, please view the LICENSE
 file that was distributed with this source code.
 """
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 
 from app.api.dependencies.auth import get_current_user
+from app.api.responses import etag_response
 from app.models.domain.user import User
 from app.models.schemas.account import Account
 from app.services.magtifun import get_account_info
@@ -18,9 +19,13 @@ router = APIRouter(prefix="/account", tags=["Account"])
 
 
 @router.get("/", response_model=Account)
-async def account_info(current_user: User = Depends(get_current_user)) -> Account:
+async def account_info(
+    request: Request, current_user: User = Depends(get_current_user)
+) -> Response:
     """
     Get current account info.
+
+    Supports conditional requests with `If-None-Match`.
     """
 
-    return get_account_info(current_user.key)
+    return etag_response(request, await get_account_info(current_user.key))
@@ -31,7 +31,7 @@ async def token_authentication(
     Create Authentication JWT Token.
     """
 
-    user = authenticate_user(form_data.username, form_data.password)
+    user = await authenticate_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
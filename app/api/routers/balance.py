@@ -9,9 +9,11 @@ file that was distributed with this source code.
 
 from typing import List
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 
 from app.api.dependencies.auth import get_current_user
+from app.api.dependencies.history import HistoryWindow
+from app.api.responses import etag_response
 from app.models.domain.user import User
 from app.models.schemas.balance import Balance, BalanceHistoryItem
 from app.services.magtifun import get_balance, get_balance_history
@@ -25,17 +27,27 @@ async def get(current_user: User = Depends(get_current_user)) -> Balance:
     Get balance.
     """
 
-    return get_balance(current_user.key)
+    return await get_balance(current_user.key)
 
 
 @router.get(
     "/history", response_model=List[BalanceHistoryItem], name="Get balance history"
 )
 async def history(
+    request: Request,
+    window: HistoryWindow = Depends(),
     current_user: User = Depends(get_current_user),
-) -> List[BalanceHistoryItem]:
+) -> Response:
     """
-    Get balance history.
+    Get balance history, newest first.
+
+    Use `limit`, `since` and `until` to get only part of the history.
+    Supports conditional requests with `If-None-Match`.
     """
 
-    return get_balance_history(current_user.key)
+    return etag_response(
+        request,
+        await get_balance_history(
+            current_user.key, window.limit, window.since, window.until
+        ),
+    )
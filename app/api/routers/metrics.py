@@ -0,0 +1,24 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", name="Get Prometheus metrics")
+async def metrics() -> Response:
+    """
+    Get upstream, parsing and cache metrics in Prometheus text format.
+    """
+
+    return Response(
+        content=generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST}
+    )
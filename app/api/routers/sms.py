@@ -7,43 +7,158 @@ For the full copyright and license information, please view the LICENSE
 file that was distributed with this source code.
 """
 
-from typing import List
+from typing import AsyncIterator, List, Union
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from app.api.dependencies.auth import get_current_user
+from app.api.dependencies.history import HistoryWindow
+from app.api.responses import json_body, json_response
+from app.models.domain.history import SMSHistoryRow
 from app.models.domain.user import User
 from app.models.schemas.sms import (
+    SMSJob,
     SMSOnSend,
     SMSSendResult,
     SMSHistoryItem,
+    SMSHistoryItemBulkRemoveStatus,
     SMSHistoryItemRemoveStatus,
+    SMSHistoryRemove,
 )
-from app.services.magtifun import send_sms, get_sms_history, remove_sms_from_history
+from app.resources import strings
+from app.services.jobs import enqueue_sms, get_sms_job
+from app.services.magtifun import (
+    send_sms,
+    send_bulk_sms,
+    get_sms_history,
+    iter_sms_history,
+    remove_bulk_sms_from_history,
+    remove_sms_from_history,
+)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
 
 router = APIRouter(prefix="/sms", tags=["SMS"])
 
 
-@router.post("/", response_model=SMSSendResult)
+@router.post(
+    "/",
+    response_model=SMSSendResult,
+    responses={status.HTTP_202_ACCEPTED: {"model": SMSJob}},
+)
 async def send(
-    sms: SMSOnSend, current_user: User = Depends(get_current_user)
-) -> SMSSendResult:
+    sms: SMSOnSend,
+    background: bool = False,
+    current_user: User = Depends(get_current_user),
+) -> Union[SMSSendResult, JSONResponse]:
     """
     Send SMS.
+
+    Pass `background=true` to queue the SMS and get a job immediately; poll
+    `/sms/jobs/{job_id}` for its result.
+    """
+
+    if background:
+        job = await enqueue_sms(current_user.key, sms)
+
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED, content=jsonable_encoder(job)
+        )
+
+    return await send_sms(current_user.key, sms)
+
+
+@router.get("/jobs/{job_id}", response_model=SMSJob, name="Get SMS job")
+async def job_status(
+    job_id: str, current_user: User = Depends(get_current_user)
+) -> SMSJob:
+    """
+    Get background SMS job status.
+    """
+
+    job = await get_sms_job(current_user.key, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=strings.JOB_NOT_FOUND
+        )
+
+    return job
+
+
+@router.post("/bulk", response_model=List[SMSSendResult], name="Send SMSs in bulk")
+async def send_bulk(
+    messages: List[SMSOnSend], current_user: User = Depends(get_current_user)
+) -> List[SMSSendResult]:
+    """
+    Send multiple SMSs.
+
+    Results are returned in the same order as the messages.
     """
 
-    return send_sms(current_user.key, sms)
+    return await send_bulk_sms(current_user.key, messages)
 
 
 @router.get("/", response_model=List[SMSHistoryItem], name="Get sent SMSs")
 async def get_all(
+    request: Request,
+    stream: bool = False,
+    page: int = Query(1, ge=1),
+    window: HistoryWindow = Depends(),
+    current_user: User = Depends(get_current_user),
+) -> Response:
+    """
+    Get sent SMSs, newest first.
+
+    Use `limit`, `page`, `since` and `until` to get only part of the history;
+    upstream pages are scraped only until the requested window is complete.
+    Starting from the first page, history is kept in a local store and only
+    pages newer than the last sync are scraped.
+
+    Pass `stream=true` or `Accept: application/x-ndjson` to receive
+    newline-delimited JSON items as soon as each history page is parsed.
+    """
+
+    if stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        items = iter_sms_history(
+            current_user.key, window.limit, page, window.since, window.until
+        )
+        # Wait for the first item before the status line is sent, so upstream
+        # errors such as a rejected key still get a proper error response.
+        try:
+            first = [await items.__anext__()]
+        except StopAsyncIteration:
+            first = []
+
+        return StreamingResponse(_ndjson(first, items), media_type=NDJSON_MEDIA_TYPE)
+
+    return json_response(
+        await get_sms_history(
+            current_user.key, window.limit, page, window.since, window.until
+        )
+    )
+
+
+@router.delete(
+    "/",
+    response_model=List[SMSHistoryItemBulkRemoveStatus],
+    name="Remove SMSs from history",
+)
+async def delete_bulk(
+    selection: SMSHistoryRemove,
     current_user: User = Depends(get_current_user),
-) -> List[SMSHistoryItem]:
+) -> List[SMSHistoryItemBulkRemoveStatus]:
     """
-    Get sent SMSs.
+    Remove multiple SMSs from history.
+
+    Removes the listed `ids` and, when `since` or `until` is given, every SMS
+    sent in that date range. Returns removal status per ID.
     """
 
-    return get_sms_history(current_user.key)
+    return await remove_bulk_sms_from_history(
+        current_user.key, selection.ids, selection.since, selection.until
+    )
 
 
 @router.delete(
@@ -60,5 +175,14 @@ async def delete(
     """
 
     return SMSHistoryItemRemoveStatus(
-        status=remove_sms_from_history(sms_id, current_user.key)
+        status=await remove_sms_from_history(sms_id, current_user.key)
     )
+
+
+async def _ndjson(
+    first: List[SMSHistoryRow], items: AsyncIterator[SMSHistoryRow]
+) -> AsyncIterator[bytes]:
+    for item in first:
+        yield json_body(item) + b"\n"
+    async for item in items:
+        yield json_body(item) + b"\n"
@@ -0,0 +1,24 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+from fastapi import APIRouter
+
+from app.models.schemas.upstream import PoolStats
+from app.services.http import get_pool_stats
+
+router = APIRouter(prefix="/upstream", tags=["Upstream"])
+
+
+@router.get("/pool", response_model=PoolStats, name="Get connection pool stats")
+async def pool() -> PoolStats:
+    """
+    Get upstream connection pool statistics.
+    """
+
+    return get_pool_stats()
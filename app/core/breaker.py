@@ -0,0 +1,71 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+import time
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker; a non-positive threshold disables it.
+
+    After threshold consecutive failures the circuit opens and calls are
+    rejected; one trial call per reset_timeout seconds is let through, its
+    success closes the circuit and its failure keeps it open.
+    """
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        """
+        :param int threshold: Consecutive failures that open the circuit.
+        :param float reset_timeout: Seconds to stay open before a trial call.
+        """
+
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    def retry_after(self) -> float:
+        """
+        Check whether a call may go through, reserving the trial call if due.
+
+        :return: Seconds until calls are allowed again, 0 if allowed now.
+        """
+
+        if self._opened_at is None:
+            return 0.0
+
+        now = time.monotonic()
+        remaining = self._opened_at + self.reset_timeout - now
+        if remaining > 0:
+            return remaining
+
+        self._opened_at = now
+        self._trial = True
+
+        return 0.0
+
+    def success(self) -> None:
+        """
+        Record successful call.
+        """
+
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    def failure(self) -> None:
+        """
+        Record failed call.
+        """
+
+        self._failures += 1
+        if self.threshold > 0 and (self._trial or self._failures >= self.threshold):
+            self._opened_at = time.monotonic()
+            self._trial = False
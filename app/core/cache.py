@@ -0,0 +1,308 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+import hashlib
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Optional
+
+from app.core.config import CACHE_URL
+from app.core.metrics import CACHE_REQUESTS
+from app.core.serialization import dumps, loads
+
+
+class TTLCache:
+    """
+    Bounded in-memory cache with per-entry expiry and LRU eviction.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, name: Optional[str] = None):
+        """
+        :param int maxsize: Maximum number of entries.
+        :param float ttl: Default entry lifetime in seconds.
+        :param Optional[str] name: Name to report hits and misses under.
+        """
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._hits = self._misses = None
+        if name is not None:
+            self._hits = CACHE_REQUESTS.labels(name, "hit")
+            self._misses = CACHE_REQUESTS.labels(name, "miss")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Get non-expired value and mark it as recently used.
+
+        :param str key: Cache key.
+        :param Any default: Value to return on miss.
+        :return: Cached value or default.
+        """
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= time.monotonic():
+            del self._entries[key]
+            entry = None
+
+        if entry is None:
+            if self._misses is not None:
+                self._misses.inc()
+            return default
+
+        if self._hits is not None:
+            self._hits.inc()
+        self._entries.move_to_end(key)
+
+        return entry[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store value, evicting the least recently used entry when full.
+
+        :param str key: Cache key.
+        :param Any value: Value to store.
+        :param Optional[float] ttl: Entry lifetime in seconds, defaults to cache TTL.
+        """
+
+        if self.maxsize <= 0:
+            return
+
+        self._entries[key] = (
+            time.monotonic() + (self.ttl if ttl is None else ttl),
+            value,
+        )
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        """
+        Remove entry if present.
+
+        :param str key: Cache key.
+        """
+
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Remove all entries.
+        """
+
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SharedCache(ABC):
+    """
+    Async cache that may be shared between workers, see create_cache().
+
+    Values must be supported by app.core.serialization; None is not cached.
+    """
+
+    def __init__(self, name: str, ttl: float):
+        """
+        :param str name: Cache name, used as key namespace and metrics label.
+        :param float ttl: Default entry lifetime in seconds.
+        """
+
+        self.name = name
+        self.ttl = ttl
+        self._hits = CACHE_REQUESTS.labels(name, "hit")
+        self._misses = CACHE_REQUESTS.labels(name, "miss")
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        """
+        Get non-expired value.
+
+        :param str key: Cache key.
+        :param Any default: Value to return on miss.
+        :return: Cached value or default.
+        """
+
+        value = await self._get(key)
+        if value is None:
+            self._misses.inc()
+            return default
+
+        self._hits.inc()
+
+        return value
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store value.
+
+        :param str key: Cache key.
+        :param Any value: Value to store.
+        :param Optional[float] ttl: Entry lifetime in seconds, defaults to cache TTL.
+        """
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """
+        Remove entry if present.
+
+        :param str key: Cache key.
+        """
+
+    @abstractmethod
+    async def _get(self, key: str) -> Any:
+        """
+        Get stored value.
+
+        :param str key: Cache key.
+        :return: Value or None.
+        """
+
+
+class MemoryCache(SharedCache):
+    """
+    Per-process SharedCache on top of TTLCache.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        """
+        :param str name: Cache name.
+        :param int maxsize: Maximum number of entries.
+        :param float ttl: Default entry lifetime in seconds.
+        """
+
+        super().__init__(name, ttl)
+        self._cache = TTLCache(maxsize, ttl)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._cache.set(key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        self._cache.delete(key)
+
+    async def _get(self, key: str) -> Any:
+        return self._cache.get(key)
+
+
+class RedisCache(SharedCache):
+    """
+    SharedCache in a Redis-protocol key-value store at CACHE_URL.
+
+    Values are stored serialized under "magtifun:<name>:<key>" with a TTL;
+    size is bounded by the store's own eviction policy. Store errors are
+    treated as misses, so an unavailable store only costs hit ratio.
+    """
+
+    def __init__(self, name: str, ttl: float):
+        # pylint: disable=C0415
+        from redis.exceptions import RedisError
+
+        super().__init__(name, ttl)
+        self._errors = (RedisError, OSError)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+
+        try:
+            await get_redis().set(
+                self._key(key), dumps(value), px=max(int(ttl * 1000), 1)
+            )
+        except self._errors:
+            pass
+
+    async def delete(self, key: str) -> None:
+        try:
+            await get_redis().delete(self._key(key))
+        except self._errors:
+            pass
+
+    async def _get(self, key: str) -> Any:
+        try:
+            data = await get_redis().get(self._key(key))
+        except self._errors:
+            return None
+
+        return None if data is None else loads(data)
+
+    def _key(self, key: str) -> str:
+        return f"magtifun:{self.name}:{key}"
+
+
+_redis = None  # pylint: disable=C0103
+
+
+def create_cache(name: str, maxsize: int, ttl: float) -> SharedCache:
+    """
+    Create cache on the backend selected by CACHE_URL.
+
+    An empty CACHE_URL keeps entries in process memory; "redis://..." (or
+    "fakeredis://" for a local in-process stand-in) shares them through a
+    Redis-protocol store.
+
+    :param str name: Cache name.
+    :param int maxsize: Maximum number of entries of in-memory caches.
+    :param float ttl: Default entry lifetime in seconds.
+    :return: Cache.
+    """
+
+    if not CACHE_URL:
+        return MemoryCache(name, maxsize, ttl)
+
+    return RedisCache(name, ttl)
+
+
+def get_redis():
+    """
+    Get process-wide Redis client for CACHE_URL.
+
+    :return: Async Redis client.
+    """
+
+    global _redis  # pylint: disable=W0603
+
+    if _redis is None:
+        # pylint: disable=C0415
+        if CACHE_URL.startswith("fakeredis://"):
+            from fakeredis import FakeAsyncRedis
+
+            _redis = FakeAsyncRedis()
+        else:
+            from redis.asyncio import from_url
+
+            _redis = from_url(CACHE_URL)
+
+    return _redis
+
+
+async def close_redis() -> None:
+    """
+    Close Redis client, if open.
+    """
+
+    global _redis  # pylint: disable=W0603
+
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
+
+def digest(value: str) -> str:
+    """
+    Get stable digest of a secret value so it can be used as a cache key.
+
+    :param str value: Secret value.
+    :return: Hex digest.
+    """
+
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
@@ -17,3 +17,65 @@ SECRET_KEY: Secret = config("SECRET_KEY", cast=str)
 ACCESS_TOKEN_EXPIRE_MINUTES: int = config(
     "ACCESS_TOKEN_EXPIRE_MINUTES", cast=int, default=60
 )
+MAGTIFUN_BASE_URL: str = config(
+    "MAGTIFUN_BASE_URL", cast=str, default="http://www.magtifun.ge"
+)
+UPSTREAM_MAX_CONNECTIONS: int = config(
+    "UPSTREAM_MAX_CONNECTIONS", cast=int, default=100
+)
+UPSTREAM_MAX_KEEPALIVE_CONNECTIONS: int = config(
+    "UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", cast=int, default=20
+)
+UPSTREAM_KEEPALIVE_EXPIRY: float = config(
+    "UPSTREAM_KEEPALIVE_EXPIRY", cast=float, default=30.0
+)
+UPSTREAM_CONNECT_TIMEOUT: float = config(
+    "UPSTREAM_CONNECT_TIMEOUT", cast=float, default=3.0
+)
+UPSTREAM_READ_TIMEOUT: float = config("UPSTREAM_READ_TIMEOUT", cast=float, default=10.0)
+UPSTREAM_RETRIES: int = config("UPSTREAM_RETRIES", cast=int, default=2)
+UPSTREAM_RETRY_BACKOFF: float = config(
+    "UPSTREAM_RETRY_BACKOFF", cast=float, default=0.2
+)
+UPSTREAM_BREAKER_THRESHOLD: int = config(
+    "UPSTREAM_BREAKER_THRESHOLD", cast=int, default=5
+)
+UPSTREAM_BREAKER_RESET: float = config(
+    "UPSTREAM_BREAKER_RESET", cast=float, default=30.0
+)
+CACHE_URL: str = config("CACHE_URL", cast=str, default="")
+AUTH_CACHE_TTL: float = config("AUTH_CACHE_TTL", cast=float, default=60.0)
+AUTH_CACHE_SIZE: int = config("AUTH_CACHE_SIZE", cast=int, default=1024)
+JWT_CACHE_SIZE: int = config("JWT_CACHE_SIZE", cast=int, default=4096)
+JWT_TRUST_WINDOW: float = config("JWT_TRUST_WINDOW", cast=float, default=0.0)
+# Logins reuse the Authentication Key of the same credentials for this long, so
+# after a password change the old password still gets a token until it expires.
+SESSION_CACHE_TTL: float = config("SESSION_CACHE_TTL", cast=float, default=120.0)
+HTML_PARSER: str = config("HTML_PARSER", cast=str, default="lxml")
+SMS_HISTORY_CONCURRENCY: int = config("SMS_HISTORY_CONCURRENCY", cast=int, default=5)
+SMS_BULK_CONCURRENCY: int = config("SMS_BULK_CONCURRENCY", cast=int, default=5)
+SMS_DELETE_CONCURRENCY: int = config("SMS_DELETE_CONCURRENCY", cast=int, default=5)
+CSRF_TOKEN_TTL: float = config("CSRF_TOKEN_TTL", cast=float, default=600.0)
+SMS_QUEUE_WORKERS: int = config("SMS_QUEUE_WORKERS", cast=int, default=2)
+SMS_QUEUE_RATE: float = config("SMS_QUEUE_RATE", cast=float, default=5.0)
+SMS_QUEUE_DATABASE: str = config("SMS_QUEUE_DATABASE", cast=str, default="")
+SMS_JOB_TTL: float = config("SMS_JOB_TTL", cast=float, default=86400.0)
+SMS_JOB_STORE_SIZE: int = config("SMS_JOB_STORE_SIZE", cast=int, default=10000)
+SMS_RATE_PER_KEY: float = config("SMS_RATE_PER_KEY", cast=float, default=2.0)
+SMS_BURST_PER_KEY: int = config("SMS_BURST_PER_KEY", cast=int, default=10)
+SMS_RATE_GLOBAL: float = config("SMS_RATE_GLOBAL", cast=float, default=20.0)
+SMS_BURST_GLOBAL: int = config("SMS_BURST_GLOBAL", cast=int, default=50)
+CREDIT_CACHE_TTL: float = config("CREDIT_CACHE_TTL", cast=float, default=60.0)
+ACCOUNT_CACHE_TTL: float = config("ACCOUNT_CACHE_TTL", cast=float, default=300.0)
+BALANCE_HISTORY_CACHE_TTL: float = config(
+    "BALANCE_HISTORY_CACHE_TTL", cast=float, default=60.0
+)
+RESPONSE_CACHE_SIZE: int = config("RESPONSE_CACHE_SIZE", cast=int, default=1024)
+SMS_HISTORY_DATABASE: str = config("SMS_HISTORY_DATABASE", cast=str, default="")
+PROFILE_SAMPLE_RATE: float = config("PROFILE_SAMPLE_RATE", cast=float, default=0.0)
+PROFILE_SLOW_THRESHOLD: float = config(
+    "PROFILE_SLOW_THRESHOLD", cast=float, default=0.0
+)
+PROFILE_SLOW_INTERVAL: float = config("PROFILE_SLOW_INTERVAL", cast=float, default=10.0)
+PROFILE_DIRECTORY: str = config("PROFILE_DIRECTORY", cast=str, default="profiles")
+PROFILE_MAX_FILES: int = config("PROFILE_MAX_FILES", cast=int, default=100)
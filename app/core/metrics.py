@@ -0,0 +1,60 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+from prometheus_client import Counter, Gauge, Histogram
+
+_FAST_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+
+UPSTREAM_SECONDS = Histogram(
+    "magtifun_upstream_request_seconds",
+    "Upstream request time until response headers, by page.",
+    ["page"],
+)
+UPSTREAM_IN_FLIGHT = Gauge(
+    "magtifun_upstream_in_flight_requests", "Upstream requests in flight."
+)
+UPSTREAM_FAILURES = Counter(
+    "magtifun_upstream_failures_total",
+    "Failed upstream requests (transport errors and 5xx), by page.",
+    ["page"],
+)
+HTML_PARSE_SECONDS = Histogram(
+    "magtifun_html_parse_seconds",
+    "HTML parse time, by parser backend.",
+    ["backend"],
+    buckets=_FAST_BUCKETS,
+)
+EXTRACT_SECONDS = Histogram(
+    "magtifun_extract_seconds",
+    "Time to extract models from a parsed page, by page.",
+    ["page"],
+    buckets=_FAST_BUCKETS,
+)
+ITEMS_PARSED = Counter(
+    "magtifun_items_parsed_total", "History items parsed, by page.", ["page"]
+)
+CACHE_REQUESTS = Counter(
+    "magtifun_cache_requests_total",
+    "Cache lookups, by cache and result (hit or miss).",
+    ["cache", "result"],
+)
@@ -0,0 +1,111 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+import cProfile
+import random
+import time
+from datetime import datetime
+from pathlib import Path
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class ProfilingMiddleware:  # pylint: disable=R0902,R0903
+    """
+    Profile sampled or slow requests with cProfile.
+
+    A request is profiled when it is sampled (sample_rate) or, with a
+    slow_threshold, at most once per slow_interval seconds; the profile is
+    kept if the request was sampled or took at least slow_threshold seconds.
+    Only one request is profiled at a time and the profile covers everything
+    the event loop ran meanwhile.
+
+    Profiles are written to directory as
+    "<time>-<route>-<milliseconds>ms.prof", readable with pstats or snakeviz.
+    Only the newest max_files profiles are kept.
+    """
+
+    def __init__(  # pylint: disable=R0913
+        self,
+        app: ASGIApp,
+        *,
+        sample_rate: float = 0.0,
+        slow_threshold: float = 0.0,
+        slow_interval: float = 10.0,
+        directory: str = "profiles",
+        max_files: int = 100,
+    ):
+        """
+        :param ASGIApp app: Wrapped application.
+        :param float sample_rate: Share of requests to profile.
+        :param float slow_threshold: Keep profiles of requests slower than this
+            many seconds; 0 disables.
+        :param float slow_interval: Minimum seconds between requests profiled
+            to catch slow ones.
+        :param str directory: Directory to store profiles in.
+        :param int max_files: Number of newest profiles to keep.
+        """
+
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.slow_interval = slow_interval
+        self.directory = Path(directory)
+        self.max_files = max_files
+        self._profiling = False
+        self._next_slow_at = 0.0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self._profiling:
+            await self.app(scope, receive, send)
+            return
+
+        sampled = random.random() < self.sample_rate
+        if not sampled:
+            now = time.monotonic()
+            if self.slow_threshold <= 0 or now < self._next_slow_at:
+                await self.app(scope, receive, send)
+                return
+            self._next_slow_at = now + self.slow_interval
+
+        self._profiling = True
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.disable()
+            self._profiling = False
+            elapsed = time.perf_counter() - started
+            if sampled or elapsed >= self.slow_threshold:
+                self._save(profiler, scope, elapsed)
+
+    def _save(self, profiler: cProfile.Profile, scope: Scope, elapsed: float) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(
+            self.directory
+            / (
+                f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{_route_name(scope)}"
+                f"-{elapsed * 1000:.0f}ms.prof"
+            )
+        )
+
+        # Names start with the time, so they sort oldest first.
+        profiles = sorted(self.directory.glob("*.prof"))
+        for path in profiles[: max(len(profiles) - self.max_files, 0)]:
+            path.unlink(missing_ok=True)
+
+
+def _route_name(scope: Scope) -> str:
+    endpoint = scope.get("endpoint")
+    if endpoint is not None:
+        return f"{endpoint.__module__.rsplit('.', 1)[-1]}.{endpoint.__name__}"
+
+    return scope["path"].strip("/").replace("/", ".") or "root"
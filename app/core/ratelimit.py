@@ -0,0 +1,218 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+import math
+import time
+from abc import ABC, abstractmethod
+
+from app.core.cache import TTLCache, get_redis
+from app.core.config import CACHE_URL
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter; a non-positive rate disables limiting.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        :param float rate: Tokens added per second.
+        :param float capacity: Maximum number of tokens (burst size).
+        """
+
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+
+    def delay(self) -> float:
+        """
+        Get time until a token is available, without taking it.
+
+        :return: Seconds to wait.
+        """
+
+        if self.rate <= 0:
+            return 0.0
+
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+        return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+
+    def take(self) -> float:
+        """
+        Take a token, reserving a future one when the bucket is empty.
+
+        :return: Seconds to wait before the taken token may be used.
+        """
+
+        delay = self.delay()
+        if self.rate > 0:
+            self._tokens -= 1
+
+        return delay
+
+
+class SharedTokenBucket(ABC):
+    """
+    Token buckets by key that may be shared between workers, see
+    create_token_bucket(); a non-positive rate disables limiting.
+    """
+
+    def __init__(self, name: str, rate: float, capacity: float):
+        """
+        :param str name: Bucket name, used as key namespace.
+        :param float rate: Tokens added per second.
+        :param float capacity: Maximum number of tokens (burst size).
+        """
+
+        self.name = name
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+
+    @abstractmethod
+    async def delay(self, key: str = "") -> float:
+        """
+        Get time until a token of given bucket is available, without taking it.
+
+        :param str key: Bucket key.
+        :return: Seconds to wait.
+        """
+
+    @abstractmethod
+    async def take(self, key: str = "") -> float:
+        """
+        Take a token, reserving a future one when the bucket is empty.
+
+        :param str key: Bucket key.
+        :return: Seconds to wait before the taken token may be used.
+        """
+
+
+class MemoryTokenBucket(SharedTokenBucket):
+    """
+    Per-process SharedTokenBucket on top of TokenBucket.
+    """
+
+    def __init__(self, name: str, rate: float, capacity: float, maxsize: int):
+        """
+        :param str name: Bucket name.
+        :param float rate: Tokens added per second.
+        :param float capacity: Maximum number of tokens (burst size).
+        :param int maxsize: Maximum number of keys; idle buckets are dropped.
+        """
+
+        super().__init__(name, rate, capacity)
+        self._buckets = TTLCache(maxsize=maxsize, ttl=3600)
+
+    async def delay(self, key: str = "") -> float:
+        return self._bucket(key).delay()
+
+    async def take(self, key: str = "") -> float:
+        return self._bucket(key).take()
+
+    def _bucket(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.capacity)
+            self._buckets.set(key, bucket)
+
+        return bucket
+
+
+class RedisTokenBucket(SharedTokenBucket):
+    """
+    SharedTokenBucket in the Redis-protocol store at CACHE_URL.
+
+    Buckets are kept as GCRA theoretical arrival times under
+    "magtifun:rate:<name>:<key>" and updated in optimistic transactions, so
+    every worker draws from the same tokens; worker clocks must be in sync.
+    While the store is unavailable, limits fall back to per-process buckets.
+    """
+
+    def __init__(self, name: str, rate: float, capacity: float, maxsize: int):
+        """
+        :param str name: Bucket name.
+        :param float rate: Tokens added per second.
+        :param float capacity: Maximum number of tokens (burst size).
+        :param int maxsize: Maximum number of keys of the fallback buckets.
+        """
+
+        # pylint: disable=C0415
+        from redis.exceptions import RedisError, WatchError
+
+        super().__init__(name, rate, capacity)
+        self._fallback = MemoryTokenBucket(name, rate, capacity, maxsize)
+        self._errors = (RedisError, OSError)
+        self._watch_error = WatchError
+
+    async def delay(self, key: str = "") -> float:
+        return await self._update(key, take=False)
+
+    async def take(self, key: str = "") -> float:
+        return await self._update(key, take=True)
+
+    async def _update(self, key: str, take: bool) -> float:
+        if self.rate <= 0:
+            return 0.0
+
+        interval = 1 / self.rate
+        tolerance = (self.capacity - 1) * interval
+        name = f"magtifun:rate:{self.name}:{key}"
+        try:
+            async with get_redis().pipeline() as pipe:
+                while True:
+                    try:
+                        await pipe.watch(name)
+                        now = time.time()
+                        arrival = max(float(await pipe.get(name) or 0), now)
+                        if take:
+                            pipe.multi()
+                            pipe.set(
+                                name,
+                                repr(arrival + interval),
+                                px=math.ceil((arrival + interval - now) * 1000),
+                            )
+                            await pipe.execute()
+                        else:
+                            await pipe.unwatch()
+
+                        return max(arrival - tolerance - now, 0.0)
+                    except self._watch_error:
+                        continue
+        except self._errors:
+            if take:
+                return await self._fallback.take(key)
+            return await self._fallback.delay(key)
+
+
+def create_token_bucket(
+    name: str, rate: float, capacity: float, maxsize: int = 1
+) -> SharedTokenBucket:
+    """
+    Create token buckets on the backend selected by CACHE_URL.
+
+    An empty CACHE_URL limits each process on its own; otherwise all workers
+    sharing the store share the limit.
+
+    :param str name: Bucket name.
+    :param float rate: Tokens added per second.
+    :param float capacity: Maximum number of tokens (burst size).
+    :param int maxsize: Maximum number of keys of per-process buckets.
+    :return: Token buckets.
+    """
+
+    if not CACHE_URL:
+        return MemoryTokenBucket(name, rate, capacity, maxsize)
+
+    return RedisTokenBucket(name, rate, capacity, maxsize)
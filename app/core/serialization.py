@@ -0,0 +1,92 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Dict
+
+# pylint: disable=E0611
+from pydantic import BaseModel
+
+from app.models.domain.history import BalanceHistoryRow, SMSHistoryRow
+from app.models.schemas.account import Account
+from app.models.schemas.balance import Balance
+
+MODEL_TAGS: Dict[type, str] = {
+    Account: "a",
+    Balance: "b",
+    BalanceHistoryRow: "bh",
+    SMSHistoryRow: "s",
+}
+
+_TAG_MODELS = {tag: model for model, tag in MODEL_TAGS.items()}
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Serialize cache value to compact JSON.
+
+    Models and history rows listed in MODEL_TAGS are stored as
+    {tag: [field values]} without field names, lists and tuples as arrays.
+    Datetimes are only supported as model fields.
+
+    :param Any value: JSON-compatible value, model or list of them.
+    :return: Serialized value.
+    """
+
+    return json.dumps(_encode(value), ensure_ascii=False, separators=(",", ":")).encode(
+        "utf-8"
+    )
+
+
+def loads(data: bytes) -> Any:
+    """
+    Deserialize value serialized with dumps(); tuples come back as lists.
+
+    :param bytes data: Serialized value.
+    :return: Value.
+    """
+
+    return _decode(json.loads(data))
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return {
+            MODEL_TAGS[type(value)]: [
+                _encode(getattr(value, field)) for field in value.__fields__
+            ]
+        }
+    if type(value) in MODEL_TAGS:
+        return {MODEL_TAGS[type(value)]: [_encode(item) for item in value]}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    if isinstance(value, datetime):
+        return value.isoformat()
+
+    return value
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, dict):
+        ((tag, values),) = value.items()
+        model = _TAG_MODELS[tag]
+        if issubclass(model, BaseModel):
+            return model(**dict(zip(model.__fields__, values)))
+
+        return model(
+            *(
+                datetime.fromisoformat(item) if kind is datetime else item
+                for item, kind in zip(values, model.__annotations__.values())
+            )
+        )
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+
+    return value
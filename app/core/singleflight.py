@@ -0,0 +1,63 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from app.core.metrics import CACHE_REQUESTS
+
+
+class SingleFlight:
+    """
+    Share one in-flight call between concurrent callers with the same key.
+
+    The call runs in its own task, so a cancelled caller doesn't cancel it
+    for the others.
+    """
+
+    def __init__(self, name: Optional[str] = None):
+        """
+        :param Optional[str] name: Name to report joined (hit) and new calls under.
+        """
+
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._hits = self._misses = None
+        if name is not None:
+            self._hits = CACHE_REQUESTS.labels(name, "hit")
+            self._misses = CACHE_REQUESTS.labels(name, "miss")
+
+    async def do(self, key: Hashable, function: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await result of function, joining a running call with the same key.
+
+        :param Hashable key: Call key.
+        :param Callable[[], Awaitable[Any]] function: Call to run if none is running.
+        :return: Call result.
+        """
+
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(function())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            if self._misses is not None:
+                self._misses.inc()
+        elif self._hits is not None:
+            self._hits.inc()
+
+        return await asyncio.shield(task)
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()
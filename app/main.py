@@ -9,11 +9,44 @@ file that was distributed with this source code.
 
 from fastapi import FastAPI
 
-from app.api.routers import account, auth, balance, sms
+from app.api.routers import account, auth, balance, metrics, sms, upstream
+from app.core.cache import close_redis
+from app.core.config import (
+    PROFILE_DIRECTORY,
+    PROFILE_MAX_FILES,
+    PROFILE_SAMPLE_RATE,
+    PROFILE_SLOW_INTERVAL,
+    PROFILE_SLOW_THRESHOLD,
+)
+from app.core.profiling import ProfilingMiddleware
+from app.services.html import warm_up_parser
+from app.services.http import close_transport, open_transport
+from app.services.jobs import start_sms_workers, stop_sms_workers
+from app.services.magtifun import close_sms_history_store
 
 app = FastAPI()
 
+if PROFILE_SAMPLE_RATE > 0 or PROFILE_SLOW_THRESHOLD > 0:
+    app.add_middleware(
+        ProfilingMiddleware,
+        sample_rate=PROFILE_SAMPLE_RATE,
+        slow_threshold=PROFILE_SLOW_THRESHOLD,
+        slow_interval=PROFILE_SLOW_INTERVAL,
+        directory=PROFILE_DIRECTORY,
+        max_files=PROFILE_MAX_FILES,
+    )
+
 app.include_router(account.router)
 app.include_router(auth.router)
 app.include_router(balance.router)
+app.include_router(metrics.router)
 app.include_router(sms.router)
+app.include_router(upstream.router)
+
+app.add_event_handler("startup", open_transport)
+app.add_event_handler("startup", warm_up_parser)
+app.add_event_handler("startup", start_sms_workers)
+app.add_event_handler("shutdown", stop_sms_workers)
+app.add_event_handler("shutdown", close_transport)
+app.add_event_handler("shutdown", close_sms_history_store)
+app.add_event_handler("shutdown", close_redis)
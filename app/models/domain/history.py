@@ -0,0 +1,34 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+# pylint: disable=C0115,R0903
+
+from datetime import datetime
+from typing import NamedTuple
+
+# History rows are scraped in bulk, so they are plain tuples with the fields
+# of the matching response schema instead of pydantic models; values are
+# typed by the parsers and not validated again. The fields repeat the schemas
+# on purpose: rows are serialized positionally and must keep their order.
+# pylint: disable=R0801
+
+
+class BalanceHistoryRow(NamedTuple):
+    date: datetime
+    message: str
+    amount: int
+    charge: bool
+
+
+class SMSHistoryRow(NamedTuple):
+    id: int
+    date: datetime
+    recipient: str
+    text: str
+    delivered: bool
@@ -10,6 +10,8 @@ file that was distributed with this source code.
 # pylint: disable=C0115,R0903
 
 from datetime import datetime
+from enum import Enum
+from typing import List, Optional
 
 # pylint: disable=E0611
 from pydantic import BaseModel
@@ -53,3 +55,52 @@ class SMSHistoryItem(BaseModel):
 
 class SMSHistoryItemRemoveStatus(BaseModel):
     status: bool
+
+
+class SMSHistoryRemove(BaseModel):
+    ids: List[int] = []
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "ids": [10000000, 10000001],
+                "since": datetime(2021, 10, 1),
+                "until": datetime(2021, 10, 5),
+            }
+        }
+
+
+class SMSHistoryItemBulkRemoveStatus(BaseModel):
+    id: int
+    status: bool
+
+
+class SMSJobStatus(str, Enum):
+    QUEUED = "queued"
+    SENDING = "sending"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class SMSJob(BaseModel):
+    id: str
+    status: SMSJobStatus
+    result: Optional[SMSSendResult] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "id": "6f1c2a4e9b7d4e0f8a3b5c6d7e8f9a0b",
+                "status": SMSJobStatus.DONE,
+                "result": {
+                    "status": True,
+                    "message": SEND_SMS_STATUSES["success"],
+                },
+                "created_at": datetime(2021, 10, 5, 12, 30),
+                "updated_at": datetime(2021, 10, 5, 12, 30, 1),
+            }
+        }
@@ -0,0 +1,30 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+# pylint: disable=C0115,R0903
+
+# pylint: disable=E0611
+from pydantic import BaseModel
+
+
+class PoolStats(BaseModel):
+    open: int
+    idle: int
+    requests: int
+    reused: int
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "open": 12,
+                "idle": 10,
+                "requests": 4812,
+                "reused": 4800,
+            }
+        }
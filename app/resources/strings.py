@@ -17,3 +17,7 @@ SEND_SMS_STATUSES = {
     "max_messages": "Maximum 3 Messages",
     "incorrect_mobile": "Incorrect mobile number",
 }
+JOB_NOT_FOUND = "Job not found"
+JOB_INTERRUPTED = "Sending was interrupted, the SMS may or may not have been sent"
+SMS_RATE_LIMITED = "Too many SMS sends, try again later"
+UPSTREAM_UNAVAILABLE = "magtifun.ge is unavailable, try again later"
@@ -0,0 +1,108 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+import re
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict
+
+MONTH_NAMES = (
+    "January",
+    "February",
+    "March",
+    "April",
+    "May",
+    "June",
+    "July",
+    "August",
+    "September",
+    "October",
+    "November",
+    "December",
+)
+
+# Lowercase English month names and abbreviations, as magtifun.ge renders
+# them whatever the server locale.
+MONTHS: Dict[str, int] = {
+    **{name[:3].lower(): number for number, name in enumerate(MONTH_NAMES, 1)},
+    **{name.lower(): number for number, name in enumerate(MONTH_NAMES, 1)},
+}
+
+GEORGIAN_MONTHS: Dict[str, int] = {
+    "იანვარი": 1,
+    "თებერვალი": 2,
+    "მარტი": 3,
+    "აპრილი": 4,
+    "მაისი": 5,
+    "ივნისი": 6,
+    "ივლისი": 7,
+    "აგვისტო": 8,
+    "სექტემბერი": 9,
+    "ოქტომბერი": 10,
+    "ნოემბერი": 11,
+    "დეკემბერი": 12,
+}
+
+_DAY = re.compile(r"\s*(\d{1,2})\s*([A-Za-z]+)\s*(\d{4})\s*")
+_TIME_LENGTH = 8
+
+
+def parse_day(text: str) -> date:
+    """
+    Parse day like "05 October 2021" or "05Oct2021".
+
+    :param str text: Day, month name or abbreviation and year.
+    :raises ValueError: if the text is not a valid day.
+    :return: Date.
+    """
+
+    match = _DAY.fullmatch(text)
+    month = MONTHS.get(match.group(2).lower()) if match else None
+    if month is None:
+        raise ValueError(f"Invalid day: {text!r}")
+
+    return date(int(match.group(3)), month, int(match.group(1)))
+
+
+def parse_datetime(day: str, time: str) -> datetime:
+    """
+    Parse day (see parse_day) and "HH:MM:SS" time.
+
+    :param str day: Day.
+    :param str time: Time.
+    :raises ValueError: if the text is not a valid date.
+    :return: Naive date in Georgian local time.
+    """
+
+    time = time.strip()
+    if len(time) != _TIME_LENGTH or time[2] != ":" or time[5] != ":":
+        raise ValueError(f"Invalid time: {time!r}")
+
+    return datetime.fromisoformat(_iso_day(day) + time)
+
+
+def parse_compact_datetime(text: str) -> datetime:
+    """
+    Parse date like "05Oct202112:30:00", as in SMS history.
+
+    :param str text: Date.
+    :raises ValueError: if the text is not a valid date.
+    :return: Naive date in Georgian local time.
+    """
+
+    text = text.strip()
+
+    return parse_datetime(text[:-_TIME_LENGTH], text[-_TIME_LENGTH:])
+
+
+# History pages repeat the same day on many rows; the time is then parsed by
+# the C ISO parser.
+@lru_cache(maxsize=4096)
+def _iso_day(text: str) -> str:
+    return f"{parse_day(text).isoformat()}T"
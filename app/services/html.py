@@ -0,0 +1,209 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+# pylint: disable=C0415
+
+import logging
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from app.core.config import HTML_PARSER
+from app.core.metrics import HTML_PARSE_SECONDS
+
+BACKENDS = ("selectolax", "lxml", "bs4")
+
+logger = logging.getLogger(__name__)
+
+
+class Node(ABC):
+    """
+    Parsed HTML element with a small, backend independent extraction API.
+    """
+
+    __slots__ = ("_node",)
+
+    def __init__(self, node):
+        self._node = node
+
+    @abstractmethod
+    def select(self, selector: str) -> List["Node"]:
+        """
+        Get all descendants matching CSS selector, in document order.
+
+        :param str selector: CSS selector.
+        :return: Matching nodes.
+        """
+
+    def select_one(self, selector: str) -> Optional["Node"]:
+        """
+        Get first descendant matching CSS selector.
+
+        :param str selector: CSS selector.
+        :return: Matching node or None.
+        """
+
+        nodes = self.select(selector)
+
+        return nodes[0] if nodes else None
+
+    @property
+    @abstractmethod
+    def text(self) -> str:
+        """
+        Concatenated text of the node and all its descendants.
+        """
+
+    @abstractmethod
+    def attr(self, name: str) -> Optional[str]:
+        """
+        Get attribute value.
+
+        :param str name: Attribute name.
+        :return: Attribute value or None.
+        """
+
+
+class _SoupNode(Node):
+    __slots__ = ()
+
+    def select(self, selector: str) -> List[Node]:
+        return [_SoupNode(node) for node in self._node.select(selector)]
+
+    def select_one(self, selector: str) -> Optional[Node]:
+        node = self._node.select_one(selector)
+
+        return None if node is None else _SoupNode(node)
+
+    @property
+    def text(self) -> str:
+        return self._node.get_text()
+
+    def attr(self, name: str) -> Optional[str]:
+        value = self._node.get(name)
+        if isinstance(value, list):
+            return " ".join(value)
+
+        return value
+
+
+class _LxmlNode(Node):
+    __slots__ = ()
+
+    def select(self, selector: str) -> List[Node]:
+        return [_LxmlNode(node) for node in _lxml_selector(selector)(self._node)]
+
+    @property
+    def text(self) -> str:
+        return self._node.text_content()
+
+    def attr(self, name: str) -> Optional[str]:
+        return self._node.get(name)
+
+
+class _SelectolaxNode(Node):
+    __slots__ = ()
+
+    def select(self, selector: str) -> List[Node]:
+        return [_SelectolaxNode(node) for node in self._node.css(selector)]
+
+    def select_one(self, selector: str) -> Optional[Node]:
+        node = self._node.css_first(selector)
+
+        return None if node is None else _SelectolaxNode(node)
+
+    @property
+    def text(self) -> str:
+        return self._node.text()
+
+    def attr(self, name: str) -> Optional[str]:
+        return self._node.attributes.get(name)
+
+
+@lru_cache(maxsize=None)
+def _lxml_selector(selector: str):
+    from lxml.cssselect import CSSSelector
+
+    return CSSSelector(selector)
+
+
+@lru_cache(maxsize=None)
+def _lxml_utf8_parser():
+    import lxml.html
+
+    return lxml.html.HTMLParser(encoding="utf-8")
+
+
+@lru_cache(maxsize=None)
+def _warn_missing(backend: str) -> None:
+    logger.warning("HTML parser %r is not available, using bs4 instead", backend)
+
+
+def parse_html(text: str, backend: Optional[str] = None) -> Node:
+    """
+    Parse HTML document.
+
+    Falls back to BeautifulSoup, with a warning logged once, when the
+    configured backend is not installed.
+
+    :param str text: HTML.
+    :param Optional[str] backend: Parser backend, defaults to HTML_PARSER setting.
+    :return: Document root node.
+    """
+
+    started = time.perf_counter()
+    backend, document = _parse(text, backend or HTML_PARSER)
+    HTML_PARSE_SECONDS.labels(backend).observe(time.perf_counter() - started)
+
+    return document
+
+
+def warm_up_parser() -> None:
+    """
+    Load configured parser backend and its CSS selector engine at startup,
+    instead of on the first parsed page.
+    """
+
+    _parse("<html></html>", HTML_PARSER)[1].select("html")
+
+
+def _parse(text: str, backend: str) -> Tuple[str, Node]:
+    if backend == "selectolax":
+        try:
+            from selectolax.lexbor import LexborHTMLParser
+        except ImportError:
+            pass
+        else:
+            return backend, _SelectolaxNode(LexborHTMLParser(text).root)
+
+    if backend == "lxml":
+        try:
+            import lxml.html
+            import cssselect  # pylint: disable=W0611
+        except ImportError:
+            pass
+        else:
+            try:
+                return backend, _LxmlNode(lxml.html.document_fromstring(text))
+            except ValueError:
+                # lxml refuses str input starting with an XML declaration
+                # that names an encoding; the text is already decoded.
+                return backend, _LxmlNode(
+                    lxml.html.document_fromstring(
+                        text.encode("utf-8"), parser=_lxml_utf8_parser()
+                    )
+                )
+
+    if backend != "bs4":
+        _warn_missing(backend)
+
+    from bs4 import BeautifulSoup
+
+    return "bs4", _SoupNode(BeautifulSoup(text, "html.parser"))
@@ -0,0 +1,222 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+import asyncio
+import math
+import random
+from typing import Optional
+
+import httpx
+from fastapi import HTTPException, status
+
+from app.core.breaker import CircuitBreaker
+from app.core.config import (
+    MAGTIFUN_BASE_URL,
+    UPSTREAM_BREAKER_RESET,
+    UPSTREAM_BREAKER_THRESHOLD,
+    UPSTREAM_CONNECT_TIMEOUT,
+    UPSTREAM_KEEPALIVE_EXPIRY,
+    UPSTREAM_MAX_CONNECTIONS,
+    UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+    UPSTREAM_READ_TIMEOUT,
+    UPSTREAM_RETRIES,
+    UPSTREAM_RETRY_BACKOFF,
+)
+from app.core.metrics import UPSTREAM_FAILURES, UPSTREAM_IN_FLIGHT, UPSTREAM_SECONDS
+from app.models.schemas.upstream import PoolStats
+from app.resources.strings import UPSTREAM_UNAVAILABLE
+
+IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+_transport: Optional[httpx.AsyncHTTPTransport] = None  # pylint: disable=C0103
+_resilient_transport: Optional["ResilientTransport"] = None  # pylint: disable=C0103
+_breaker = CircuitBreaker(UPSTREAM_BREAKER_THRESHOLD, UPSTREAM_BREAKER_RESET)
+_counters = {"requests": 0, "connections": 0}
+
+
+class ResilientTransport(httpx.AsyncBaseTransport):
+    """
+    Transport adding retries and a circuit breaker to another transport.
+
+    Transport errors and 5xx responses count as failures. Idempotent requests,
+    and requests sent with the "idempotent" extension, are retried up to
+    UPSTREAM_RETRIES times with jittered exponential backoff. While the
+    circuit is open, or once retries are exhausted, requests fail with 503.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        retries = UPSTREAM_RETRIES if _is_idempotent(request) else 0
+        page = _page_label(request.url)
+        seconds = UPSTREAM_SECONDS.labels(page)
+
+        for attempt in range(retries + 1):
+            retry_after = _breaker.retry_after()
+            if retry_after > 0:
+                raise _unavailable(retry_after)
+
+            try:
+                with UPSTREAM_IN_FLIGHT.track_inprogress(), seconds.time():
+                    response = await self._transport.handle_async_request(request)
+            except httpx.TransportError as exception:
+                _breaker.failure()
+                UPSTREAM_FAILURES.labels(page).inc()
+                if attempt == retries:
+                    raise _unavailable() from exception
+            else:
+                if response.status_code < 500:
+                    _breaker.success()
+                    return response
+
+                _breaker.failure()
+                UPSTREAM_FAILURES.labels(page).inc()
+                await response.aclose()
+                if attempt == retries:
+                    raise _unavailable()
+
+            await asyncio.sleep(
+                random.uniform(0, UPSTREAM_RETRY_BACKOFF * 2**attempt)
+            )
+
+        raise _unavailable()
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def get_transport() -> httpx.AsyncHTTPTransport:
+    """
+    Get process-wide keep-alive transport to magtifun.ge.
+
+    :return: Shared transport.
+    """
+
+    global _transport  # pylint: disable=W0603
+
+    if _transport is None:
+        _transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=UPSTREAM_MAX_CONNECTIONS,
+                max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY,
+            )
+        )
+
+    return _transport
+
+
+async def open_transport() -> None:
+    """
+    Create shared transport at startup.
+
+    Building it loads the connection pool and the TLS certificates, which
+    would otherwise add to the latency of the first upstream request.
+    """
+
+    get_transport()
+
+
+async def close_transport() -> None:
+    """
+    Close shared transport and all pooled connections.
+    """
+
+    global _transport, _resilient_transport  # pylint: disable=W0603
+
+    if _transport is not None:
+        await _transport.aclose()
+        _transport = None
+        _resilient_transport = None
+
+
+def get_client(key: Optional[str] = None) -> httpx.AsyncClient:
+    """
+    Get async HTTP client on top of the shared connection pool.
+
+    The client only holds cookies, so users never share a cookie jar while
+    still reusing the same connections. Do not close it: closing a client
+    closes the shared transport. Requests time out after
+    UPSTREAM_CONNECT_TIMEOUT / UPSTREAM_READ_TIMEOUT seconds and go through
+    ResilientTransport.
+
+    :param Optional[str] key: Authentication Key.
+    :return: Client.
+    """
+
+    global _resilient_transport  # pylint: disable=W0603
+
+    if _resilient_transport is None:
+        _resilient_transport = ResilientTransport(get_transport())
+
+    return httpx.AsyncClient(
+        cookies={"User": key} if key else None,
+        headers={"Referer": MAGTIFUN_BASE_URL},
+        follow_redirects=True,
+        timeout=httpx.Timeout(
+            UPSTREAM_READ_TIMEOUT,
+            connect=UPSTREAM_CONNECT_TIMEOUT,
+            pool=UPSTREAM_CONNECT_TIMEOUT,
+        ),
+        transport=_resilient_transport,
+        event_hooks={"request": [_on_request]},
+    )
+
+
+def get_pool_stats() -> PoolStats:
+    """
+    Get shared connection pool statistics.
+
+    :return: Pool statistics.
+    """
+
+    connections = []
+    if _transport is not None:
+        # pylint: disable=W0212
+        connections = _transport._pool.connections
+
+    return PoolStats(
+        open=len(connections),
+        idle=sum(1 for connection in connections if connection.is_idle()),
+        requests=_counters["requests"],
+        reused=max(_counters["requests"] - _counters["connections"], 0),
+    )
+
+
+def _is_idempotent(request: httpx.Request) -> bool:
+    return request.method in IDEMPOTENT_METHODS or bool(
+        request.extensions.get("idempotent")
+    )
+
+
+def _page_label(url: httpx.URL) -> str:
+    page = url.params.get("page")
+
+    return url.path if page is None else f"{url.path}?page={page}"
+
+
+def _unavailable(retry_after: Optional[float] = None) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=UPSTREAM_UNAVAILABLE,
+        headers=None
+        if retry_after is None
+        else {"Retry-After": str(math.ceil(retry_after))},
+    )
+
+
+async def _on_request(request: httpx.Request) -> None:
+    _counters["requests"] += 1
+    request.extensions["trace"] = _trace
+
+
+async def _trace(event_name: str, _info: dict) -> None:
+    if event_name == "connection.connect_tcp.complete":
+        _counters["connections"] += 1
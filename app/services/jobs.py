@@ -0,0 +1,337 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+import asyncio
+import json
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from app.core.cache import TTLCache, digest
+from app.core.config import (
+    SMS_JOB_STORE_SIZE,
+    SMS_JOB_TTL,
+    SMS_QUEUE_DATABASE,
+    SMS_QUEUE_RATE,
+    SMS_QUEUE_WORKERS,
+)
+from app.models.schemas.sms import SMSJob, SMSJobStatus, SMSOnSend, SMSSendResult
+from app.resources.strings import JOB_INTERRUPTED, SEND_SMS_STATUSES
+from app.services.magtifun import send_sms
+
+
+UNFINISHED_STATUSES = frozenset((SMSJobStatus.QUEUED, SMSJobStatus.SENDING))
+
+
+class JobStore:
+    """
+    In-memory SMS job store.
+
+    Unfinished jobs are kept until they finish; finished jobs expire after
+    SMS_JOB_TTL seconds, or earlier once there are more than
+    SMS_JOB_STORE_SIZE of them. Methods may block; call them from a worker
+    thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._unfinished: Dict[str, Tuple[SMSJob, str, SMSOnSend]] = {}
+        self._jobs = TTLCache(maxsize=SMS_JOB_STORE_SIZE, ttl=SMS_JOB_TTL)
+
+    def save(self, job: SMSJob, key: str, sms: SMSOnSend) -> None:
+        """
+        Store job together with what is needed to run it.
+
+        :param SMSJob job: Job.
+        :param str key: Authentication Key.
+        :param SMSOnSend sms: SMS Body.
+        """
+
+        with self._lock:
+            if job.status in UNFINISHED_STATUSES:
+                self._unfinished[job.id] = (job, key, sms)
+            else:
+                self._unfinished.pop(job.id, None)
+                self._jobs.set(job.id, (job, key, sms))
+
+    def get(self, job_id: str) -> Optional[Tuple[SMSJob, str, SMSOnSend]]:
+        """
+        Get job with its Authentication Key and SMS Body.
+
+        :param str job_id: Job ID.
+        :return: Job, Authentication Key and SMS Body, or None.
+        """
+
+        with self._lock:
+            entry = self._unfinished.get(job_id)
+
+            return entry if entry is not None else self._jobs.get(job_id)
+
+    def pending(self) -> List[str]:
+        """
+        Get IDs of jobs still queued, e.g. after a restart.
+
+        Jobs that were being sent have an unknown outcome: sms_send.php is not
+        idempotent, so they are marked failed instead of being sent again.
+
+        :return: Job IDs.
+        """
+
+        return []
+
+
+class SQLiteJobStore(JobStore):
+    """
+    SMS job store persisted in a local SQLite database.
+
+    Unfinished jobs survive restarts. The Authentication Key is stored along
+    with the job, so keep the database file private.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        import sqlite3  # pylint: disable=C0415
+
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS sms_jobs ("
+            "id TEXT PRIMARY KEY, key TEXT, sms TEXT, job TEXT, status TEXT, "
+            "updated_at TEXT)"
+        )
+        self._connection.execute(
+            "DELETE FROM sms_jobs WHERE status IN (?, ?) AND updated_at < ?",
+            (
+                SMSJobStatus.DONE.value,
+                SMSJobStatus.FAILED.value,
+                (datetime.utcnow() - timedelta(seconds=SMS_JOB_TTL)).isoformat(),
+            ),
+        )
+        self._connection.commit()
+
+    def save(self, job: SMSJob, key: str, sms: SMSOnSend) -> None:
+        with self._lock:
+            super().save(job, key, sms)
+            self._connection.execute(
+                "INSERT OR REPLACE INTO sms_jobs VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    job.id,
+                    key,
+                    sms.json(),
+                    job.json(),
+                    job.status.value,
+                    job.updated_at.isoformat(),
+                ),
+            )
+            self._connection.commit()
+
+    def get(self, job_id: str) -> Optional[Tuple[SMSJob, str, SMSOnSend]]:
+        with self._lock:
+            entry = super().get(job_id)
+            if entry is not None:
+                return entry
+
+            row = self._connection.execute(
+                "SELECT job, key, sms FROM sms_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        return (
+            SMSJob(**json.loads(row[0])),
+            row[1],
+            SMSOnSend(**json.loads(row[2])),
+        )
+
+    def pending(self) -> List[str]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id FROM sms_jobs WHERE status = ?",
+                (SMSJobStatus.SENDING.value,),
+            ).fetchall()
+        for row in rows:
+            job, key, sms = self.get(row[0])
+            job.status = SMSJobStatus.FAILED
+            job.result = SMSSendResult(status=False, message=JOB_INTERRUPTED)
+            job.updated_at = datetime.utcnow()
+            self.save(job, key, sms)
+
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id FROM sms_jobs WHERE status = ? ORDER BY rowid",
+                (SMSJobStatus.QUEUED.value,),
+            ).fetchall()
+
+        return [row[0] for row in rows]
+
+    def close(self) -> None:
+        """
+        Close database connection.
+        """
+
+        with self._lock:
+            self._connection.close()
+
+
+_store: Optional[JobStore] = None  # pylint: disable=C0103
+_queue: Optional[asyncio.Queue] = None  # pylint: disable=C0103
+_workers: List[asyncio.Task] = []
+_next_send_at = 0.0  # pylint: disable=C0103
+
+
+async def start_sms_workers() -> None:
+    """
+    Start SMS_QUEUE_WORKERS workers draining the SMS job queue.
+    """
+
+    global _store, _queue  # pylint: disable=W0603
+
+    if _queue is not None:
+        return
+
+    _store = (
+        await run_in_threadpool(SQLiteJobStore, SMS_QUEUE_DATABASE)
+        if SMS_QUEUE_DATABASE
+        else JobStore()
+    )
+    _queue = asyncio.Queue()
+    for job_id in await run_in_threadpool(_store.pending):
+        _queue.put_nowait(job_id)
+
+    for _ in range(max(SMS_QUEUE_WORKERS, 1)):
+        _workers.append(asyncio.ensure_future(_work()))
+
+
+async def stop_sms_workers() -> None:
+    """
+    Stop workers; unfinished jobs stay queued in the SQLite store, if any.
+    """
+
+    global _store, _queue  # pylint: disable=W0603
+
+    for worker in _workers:
+        worker.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+    if isinstance(_store, SQLiteJobStore):
+        await run_in_threadpool(_store.close)
+    _store = None
+    _queue = None
+
+
+async def enqueue_sms(key: str, sms: SMSOnSend) -> SMSJob:
+    """
+    Queue SMS for sending in background.
+
+    :param str key: Authentication Key.
+    :param SMSOnSend sms: SMS Body.
+    :return: Queued job.
+    """
+
+    await start_sms_workers()
+
+    now = datetime.utcnow()
+    job = SMSJob(
+        id=uuid.uuid4().hex,
+        status=SMSJobStatus.QUEUED,
+        created_at=now,
+        updated_at=now,
+    )
+    await run_in_threadpool(_store.save, job, key, sms)
+    _queue.put_nowait(job.id)
+
+    return job
+
+
+async def get_sms_job(key: str, job_id: str) -> Optional[SMSJob]:
+    """
+    Get SMS job owned by given Authentication Key.
+
+    :param str key: Authentication Key.
+    :param str job_id: Job ID.
+    :return: Job or None.
+    """
+
+    if _store is None:
+        return None
+
+    entry = await run_in_threadpool(_store.get, job_id)
+    if entry is None or digest(entry[1]) != digest(key):
+        return None
+
+    return entry[0]
+
+
+async def _work() -> None:
+    while True:
+        job_id = await _queue.get()
+        try:
+            entry = await run_in_threadpool(_store.get, job_id)
+            if entry is not None:
+                await _run(*entry)
+        finally:
+            _queue.task_done()
+
+
+async def _run(job: SMSJob, key: str, sms: SMSOnSend) -> None:
+    await _throttle()
+    await _update(job, key, sms, SMSJobStatus.SENDING)
+
+    try:
+        result = await send_sms(key, sms, wait=True)
+    except HTTPException as exception:
+        await _update(
+            job,
+            key,
+            sms,
+            SMSJobStatus.FAILED,
+            SMSSendResult(status=False, message=str(exception.detail)),
+        )
+    except Exception:  # pylint: disable=W0703
+        await _update(
+            job,
+            key,
+            sms,
+            SMSJobStatus.FAILED,
+            SMSSendResult(status=False, message=SEND_SMS_STATUSES["default"]),
+        )
+    else:
+        await _update(job, key, sms, SMSJobStatus.DONE, result)
+
+
+async def _update(
+    job: SMSJob,
+    key: str,
+    sms: SMSOnSend,
+    status: SMSJobStatus,
+    result: Optional[SMSSendResult] = None,
+) -> None:
+    job.status = status
+    job.result = result
+    job.updated_at = datetime.utcnow()
+    await run_in_threadpool(_store.save, job, key, sms)
+
+
+async def _throttle() -> None:
+    global _next_send_at  # pylint: disable=W0603
+
+    if SMS_QUEUE_RATE <= 0:
+        return
+
+    now = asyncio.get_running_loop().time()
+    delay = _next_send_at - now
+    _next_send_at = max(now, _next_send_at) + 1 / SMS_QUEUE_RATE
+
+    if delay > 0:
+        await asyncio.sleep(delay)
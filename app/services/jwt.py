@@ -7,15 +7,17 @@ For the full copyright and license information, please view the LICENSE
 file that was distributed with this source code.
 """
 
+import time
 from datetime import datetime, timedelta
 from typing import Dict
 
-from jose import jwt
-
-from app.core.config import SECRET_KEY
+from app.core.cache import TTLCache, digest
+from app.core.config import JWT_CACHE_SIZE, JWT_TRUST_WINDOW, SECRET_KEY
 
 ALGORITHM = "HS256"
 
+_token_cache = TTLCache(maxsize=JWT_CACHE_SIZE, ttl=0, name="jwt")
+
 
 def create_access_token(data: Dict[str, any], expires_delta: timedelta) -> str:
     """
@@ -26,6 +28,50 @@ def create_access_token(data: Dict[str, any], expires_delta: timedelta) -> str:
     :return: JWT Token.
     """
 
+    # python-jose pulls in the cryptography backend, which is the slowest
+    # import of the app; it is imported on first use instead.
+    from jose import jwt  # pylint: disable=C0415
+
     to_encode = data.copy()
-    to_encode.update({"exp": datetime.utcnow() + expires_delta})
+    now = datetime.utcnow()
+    to_encode.update({"exp": now + expires_delta, "iat": now})
     return jwt.encode(to_encode, str(SECRET_KEY), algorithm=ALGORITHM)
+
+
+def decode_access_token(token: str) -> Dict[str, any]:
+    """
+    Verify JWT Token and get its payload.
+
+    Verified payloads are cached until the token expires, so repeated
+    requests with the same token skip signature verification.
+
+    :param str token: JWT Token.
+    :raises JWTError: if the token is invalid or expired.
+    :return: JWT Payload.
+    """
+
+    cache_key = digest(token)
+    payload = _token_cache.get(cache_key)
+    if payload is None:
+        from jose import jwt  # pylint: disable=C0415
+
+        payload = jwt.decode(token, str(SECRET_KEY), algorithms=[ALGORITHM])
+        expires_in = payload.get("exp", 0) - time.time()
+        if expires_in > 0:
+            _token_cache.set(cache_key, payload, expires_in)
+
+    return payload
+
+
+def is_token_trusted(payload: Dict[str, any]) -> bool:
+    """
+    Check whether token is young enough to skip the upstream key check.
+
+    Tokens issued less than JWT_TRUST_WINDOW seconds ago are trusted; upstream
+    still rejects a revoked key on the first page fetched with it.
+
+    :param Dict[str, any] payload: Verified JWT Payload.
+    :return: Whether the token is trusted.
+    """
+
+    return payload.get("iat", 0) + JWT_TRUST_WINDOW > time.time()
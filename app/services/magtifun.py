@@ -7,172 +7,434 @@ For the full copyright and license information, please view the LICENSE
 file that was distributed with this source code.
 """
 
-from datetime import datetime
-from typing import Union
-
-import requests
-from bs4 import BeautifulSoup as bs
-from fastapi import HTTPException
-
+import asyncio
+import hashlib
+import hmac
+import math
+import re
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import (
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Tuple,
+    Union,
+)
+
+import httpx
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from app.core.cache import create_cache, digest
+from app.core.config import (
+    ACCOUNT_CACHE_TTL,
+    AUTH_CACHE_SIZE,
+    AUTH_CACHE_TTL,
+    BALANCE_HISTORY_CACHE_TTL,
+    CREDIT_CACHE_TTL,
+    CSRF_TOKEN_TTL,
+    MAGTIFUN_BASE_URL,
+    RESPONSE_CACHE_SIZE,
+    SECRET_KEY,
+    SESSION_CACHE_TTL,
+    SMS_BULK_CONCURRENCY,
+    SMS_BURST_GLOBAL,
+    SMS_BURST_PER_KEY,
+    SMS_DELETE_CONCURRENCY,
+    SMS_HISTORY_CONCURRENCY,
+    SMS_HISTORY_DATABASE,
+    SMS_RATE_GLOBAL,
+    SMS_RATE_PER_KEY,
+)
+from app.core.metrics import CACHE_REQUESTS, EXTRACT_SECONDS, ITEMS_PARSED
+from app.core.ratelimit import create_token_bucket
+from app.core.singleflight import SingleFlight
+from app.models.domain.history import BalanceHistoryRow, SMSHistoryRow
 from app.models.domain.user import User
 from app.models.schemas.account import Account, Gender
-from app.models.schemas.balance import Balance, BalanceHistoryItem
-from app.models.schemas.sms import SMSOnSend, SMSSendResult, SMSHistoryItem
-from app.resources.strings import SEND_SMS_STATUSES
+from app.models.schemas.balance import Balance
+from app.models.schemas.sms import (
+    SMSOnSend,
+    SMSSendResult,
+    SMSHistoryItemBulkRemoveStatus,
+)
+from app.resources.strings import SEND_SMS_STATUSES, SMS_RATE_LIMITED
+from app.services.dates import (
+    GEORGIAN_MONTHS,
+    parse_compact_datetime,
+    parse_datetime,
+)
+from app.services.html import Node, parse_html
+from app.services.http import get_client
+from app.services.sms_history import SMSHistoryStore
+
+SITE_BASE_URL: str = MAGTIFUN_BASE_URL
+GEORGIA_TIMEZONE = timezone(timedelta(hours=4))
+LOGGED_IN_MARKER = "თქვენს ანგარიშზეა"
+# A rejected key gets the logged-out home page with status 200 instead of the
+# requested page. Only the home page is checked for the Georgian
+# LOGGED_IN_MARKER; the others, some rendered with lang=en, are checked for
+# their language-neutral content container.
+_PAGE_MARKERS: Dict[str, Pattern[bytes]] = {
+    "/": re.compile(re.escape(LOGGED_IN_MARKER.encode("utf-8"))),
+    "/index.php?page=2": re.compile(rb"""name=["']?message_body\b"""),
+    "/index.php?page=7": re.compile(rb"""id=["']?user_name\b"""),
+    "/index.php?page=10&lang=en": re.compile(rb"""id=["']?message_list\b"""),
+    "/index.php?page=16&lang=en": re.compile(
+        rb"""class=["']?(?:[\w-]+\s+)*left_side\b"""
+    ),
+}
+# sms_send.php answers a stale CSRF token with its generic failure status,
+# without sending anything.
+CSRF_REJECTED_STATUS = "default"
+
+_auth_cache = create_cache("auth", AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+_session_cache = create_cache("session", AUTH_CACHE_SIZE, SESSION_CACHE_TTL)
+_csrf_cache = create_cache("csrf_form", AUTH_CACHE_SIZE, CSRF_TOKEN_TTL)
+_credit_cache = create_cache("credit", AUTH_CACHE_SIZE, CREDIT_CACHE_TTL)
+_send_buckets = create_token_bucket(
+    "sms", SMS_RATE_PER_KEY, SMS_BURST_PER_KEY, AUTH_CACHE_SIZE
+)
+_global_send_bucket = create_token_bucket(
+    "sms_global", SMS_RATE_GLOBAL, SMS_BURST_GLOBAL
+)
+_response_cache = create_cache("response", RESPONSE_CACHE_SIZE, ACCOUNT_CACHE_TTL)
+_RESPONSE_CACHE_ENDPOINTS = ("account", "balance_history")
+_sms_history_store: Optional[SMSHistoryStore] = None  # pylint: disable=C0103
+_upstream_flight = SingleFlight(name="single_flight")
+_page_memo_hits = CACHE_REQUESTS.labels("page_memo", "hit")
+
+
+class Page:  # pylint: disable=R0903
+    """
+    Fetched upstream page, parsed on first access.
+    """
+
+    __slots__ = ("text", "_document")
+
+    def __init__(self, text: str):
+        self.text = text
+        self._document = None
+
+    @property
+    def document(self) -> Node:
+        """
+        Parsed page.
+        """
+
+        if self._document is None:
+            self._document = parse_html(self.text)
+
+        return self._document
+
+
+_page_memo: ContextVar[Optional[Dict[Tuple[str, str], Page]]] = ContextVar(
+    "page_memo", default=None
+)
+
+
+def open_page_memo() -> None:
+    """
+    Start request-scoped memo of upstream pages.
+
+    Pages fetched by get_page() after this call are reused for the rest of the
+    current request (asyncio task), e.g. the home page downloaded while
+    validating the Authentication Key is reused by get_balance().
+    """
 
-SITE_BASE_URL: str = "http://www.magtifun.ge"
+    _page_memo.set({})
 
 
-def get_session(key: str) -> requests.Session():
+async def get_page(key: str, path: str) -> Page:
     """
-    Get authenticated session with given authentication key.
+    Get upstream page, reusing a copy fetched earlier in the same request.
+
+    Concurrent requests for the same page share one upstream fetch and parse.
 
     :param str key: Authentication Key.
-    :return: Authenticated Session.
+    :param str path: Page path relative to SITE_BASE_URL.
+    :raises HTTPException: 401 if upstream served the logged-out page.
+    :return: Page.
     """
 
-    session = requests.Session()
-    session.cookies.set("User", key)
-    session.headers["Referer"] = SITE_BASE_URL
+    memo = _page_memo.get()
+    memo_key = (key, path)
+    if memo is not None and memo_key in memo:
+        _page_memo_hits.inc()
+        return memo[memo_key]
+
+    async def fetch() -> Page:
+        response = await get_client(key).get(f"{SITE_BASE_URL}{path}")
+        await _check_logged_in(key, response, _PAGE_MARKERS.get(path))
+        response.encoding = "utf-8"
+
+        return Page(response.text)
+
+    page = await _upstream_flight.do((digest(key), path, None), fetch)
+    if memo is not None:
+        memo[memo_key] = page
 
-    return session
+    return page
 
 
-def check_auth_key(key: str) -> bool:
+async def check_auth_key(key: str) -> bool:
     """
     Check if Authentication Key is correct or not.
 
+    Positive results are cached for AUTH_CACHE_TTL seconds.
+
     :param str key: Authentication Key.
     :return: Whether if Authentication Key is correct or not.
     """
 
-    session = get_session(key)
+    cache_key = digest(key)
+    if await _auth_cache.get(cache_key):
+        return True
 
-    response = session.get(f"{SITE_BASE_URL}/")
-    response.encoding = "utf-8"
+    try:
+        await get_page(key, "/")
+    except HTTPException as exception:
+        if exception.status_code == status.HTTP_401_UNAUTHORIZED:
+            return False
+        raise
+
+    await _auth_cache.set(cache_key, True)
 
-    return "თქვენს ანგარიშზეა" in response.text
+    return True
 
 
-def authenticate_user(username: str, password: str) -> Union[User, None]:
+async def invalidate_auth_key(key: str) -> None:
+    """
+    Forget cached validation result of given Authentication Key.
+
+    :param str key: Authentication Key.
+    """
+
+    await _auth_cache.delete(digest(key))
+
+
+async def invalidate_response_cache(key: str) -> None:
+    """
+    Forget cached account info and balance history of given Authentication Key.
+
+    Called after every operation that changes upstream account state.
+
+    :param str key: Authentication Key.
+    """
+
+    cache_key = digest(key)
+    for endpoint in _RESPONSE_CACHE_ENDPOINTS:
+        await _response_cache.delete(f"{endpoint}:{cache_key}")
+
+
+async def authenticate_user(username: str, password: str) -> Union[User, None]:
     """
     Authenticate user with given username and password.
 
+    The resulting Authentication Key is reused for SESSION_CACHE_TTL seconds
+    for the same credentials, as long as it is still valid upstream. Upstream
+    is not asked to check the password again in the meantime, so an old
+    password keeps working for that long after it has been changed.
+
     :param str username: Authentication username.
     :param str password: Authentication password.
     :return: Authenticated User or none.
     """
 
-    session = requests.Session()
+    credentials = _credentials_digest(username, password)
+    key = await _session_cache.get(credentials)
+    if key is not None:
+        if await check_auth_key(key):
+            return User(key=key)
+        await _session_cache.delete(credentials)
 
-    form_response = session.get(f"{SITE_BASE_URL}/")
-    soup = bs(form_response.text, "html.parser")
+    client = get_client()
+    form_response = await client.get(f"{SITE_BASE_URL}/")
     form_data = {
         "user": username,
         "password": password,
         "act": "1",
-        "csrf_token": soup.select('input[name="csrf_token"]')[0]["value"],
+        "csrf_token": _parse_csrf_token(parse_html(form_response.text)),
     }
 
-    login_response = session.post(f"{SITE_BASE_URL}/index.php?page=11", data=form_data)
+    login_response = await client.post(
+        f"{SITE_BASE_URL}/index.php?page=11", data=form_data
+    )
     login_response.encoding = "utf-8"
 
-    key = session.cookies.get("User")
-    if check_auth_key(key):
-        return User(key=key)
+    key = client.cookies.get("User")
+    if not key:
+        return None
+
+    if LOGGED_IN_MARKER in login_response.text:
+        await _auth_cache.set(digest(key), True)
+    elif not await check_auth_key(key):
+        return None
+
+    await _session_cache.set(credentials, key)
 
-    return None
+    return User(key=key)
 
 
-def send_sms(key: str, sms: SMSOnSend) -> SMSSendResult:
+async def send_sms(key: str, sms: SMSOnSend, wait: bool = False) -> SMSSendResult:
     """
     Send SMS.
 
+    Sends are rate limited per Authentication Key and for all keys together,
+    across workers when CACHE_URL is set, and rejected without an upstream
+    round trip while the account is known to have no credit left. The SMS
+    form CSRF token, with the cookies set along with it, is reused between
+    sends for CSRF_TOKEN_TTL seconds and refreshed once when upstream
+    rejects it. Any other reply is final: sms_send.php is not
+    idempotent, so an unexpected reply is reported as "default" instead of
+    risking a second send; the cached token is dropped all the same.
+
     :param str key: Authentication Key.
     :param SMSOnSend sms: SMS Body.
+    :param bool wait: Wait for the rate limiter instead of failing with 429.
+    :raises HTTPException: if the rate limit is exceeded.
     :return: SMS send result.
     """
 
-    session = get_session(key)
+    cache_key = digest(key)
+    if await _credit_cache.get(cache_key) == 0:
+        return SMSSendResult(
+            status=False, message=SEND_SMS_STATUSES["not_enough_credit"]
+        )
 
-    form_response = session.get(f"{SITE_BASE_URL}/index.php?page=2")
-    soup = bs(form_response.text, "html.parser")
-    form_data = {
-        "csrf_token": soup.select('input[name="csrf_token"]')[0]["value"],
-        "recipients": sms.recipient,
-        "message_body": sms.message,
-    }
-    send_response = session.post(
-        f"{SITE_BASE_URL}/scripts/sms_send.php", data=form_data
-    )
-    status_message = send_response.text
+    await _acquire_send_slot(cache_key, wait)
 
-    if status_message == "not_logged_in":
-        raise HTTPException(status_code=401)
+    status_message = None
+    form = await _csrf_cache.get(cache_key)
+    if form is not None:
+        status_message = await _post_sms(key, sms, *form)
+
+    if status_message is None or status_message == CSRF_REJECTED_STATUS:
+        status_message = await _post_sms(key, sms, *await _fetch_csrf_token(key))
 
     if status_message not in SEND_SMS_STATUSES:
         status_message = "default"
+    if status_message == CSRF_REJECTED_STATUS:
+        await _csrf_cache.delete(cache_key)
+
+    if status_message == "not_enough_credit":
+        await _credit_cache.set(cache_key, 0)
+    elif status_message == "success":
+        await invalidate_response_cache(key)
 
     return SMSSendResult(
         status=status_message == "success", message=SEND_SMS_STATUSES[status_message]
     )
 
 
-def get_account_info(key: str) -> Account:
+async def send_bulk_sms(key: str, messages: List[SMSOnSend]) -> List[SMSSendResult]:
     """
-    Get current account info.
+    Send multiple SMSs, at most SMS_BULK_CONCURRENCY at a time.
 
-    :param str key: Authentication key.
-    :return: Account info.
+    Unlike send_sms(), messages over the rate limit wait for their turn.
+
+    :param str key: Authentication Key.
+    :param List[SMSOnSend] messages: SMS Bodies.
+    :return: SMS send results, in the same order as messages.
     """
 
-    session = get_session(key)
+    if await _csrf_cache.get(digest(key)) is None:
+        await _fetch_csrf_token(key)
+
+    semaphore = asyncio.Semaphore(SMS_BULK_CONCURRENCY)
+
+    async def send(sms: SMSOnSend) -> SMSSendResult:
+        async with semaphore:
+            return await send_sms(key, sms, wait=True)
+
+    return list(await asyncio.gather(*(send(sms) for sms in messages)))
+
+
+async def _acquire_send_slot(cache_key: str, wait: bool) -> None:
+    if not wait:
+        delay = max(
+            await _send_buckets.delay(cache_key), await _global_send_bucket.delay()
+        )
+        if delay > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=SMS_RATE_LIMITED,
+                headers={"Retry-After": str(math.ceil(delay))},
+            )
+
+    delay = max(await _send_buckets.take(cache_key), await _global_send_bucket.take())
+    if delay > 0:
+        await asyncio.sleep(delay)
 
-    response = session.get(f"{SITE_BASE_URL}/index.php?page=7")
+
+async def _fetch_csrf_token(key: str) -> Tuple[str, List[List[str]]]:
+    path = "/index.php?page=2"
+    client = get_client(key)
+    response = await client.get(f"{SITE_BASE_URL}{path}")
+    await _check_logged_in(key, response, _PAGE_MARKERS[path])
     response.encoding = "utf-8"
-    soup = bs(response.text, "html.parser")
 
-    day = soup.find("select", {"id": "day"}).find("option", {"selected": True}).text
-    month = soup.find("select", {"id": "month"}).find("option", {"selected": True}).text
-    year = soup.find("select", {"id": "year"}).find("option", {"selected": True}).text
+    # The token may be bound to a session cookie set with the form, so those
+    # cookies are kept with it and sent along with every SMS.
+    form = (
+        _parse_csrf_token(parse_html(response.text)),
+        [
+            [cookie.name, cookie.value]
+            for cookie in client.cookies.jar
+            if cookie.name != "User"
+        ],
+    )
+    await _csrf_cache.set(digest(key), form)
 
-    birthdate = None
-    if day and month and year:
-        months = {
-            "იანვარი": 1,
-            "თებერვალი": 2,
-            "მარტი": 3,
-            "აპრილი": 4,
-            "მაისი": 5,
-            "ივნისი": 6,
-            "ივლისი": 7,
-            "აგვისტო": 8,
-            "სექტემბერი": 9,
-            "ოქტომბერი": 10,
-            "ნოემბერი": 11,
-            "დეკემბერი": 12,
-        }
-
-        birthdate = datetime(int(year), months[month], int(day))
+    return form
 
-    return Account(
-        first_name=soup.find("input", {"id": "f_name"}).get("value"),
-        last_name=soup.find("input", {"id": "l_name"}).get("value"),
-        username=soup.find("input", {"id": "user_name"}).get("value"),
-        phone=soup.find(
-            "input", {"class": "round_border large_box", "disabled": True}
-        ).get("value"),
-        city=soup.find("select", {"id": "city"})
-        .find("option", {"selected": True})
-        .text.strip(),
-        birthdate=birthdate,
-        gender=Gender.FEMALE
-        if soup.find("input", {"id": "female", "checked": True})
-        else Gender.MALE,
+
+async def _post_sms(
+    key: str, sms: SMSOnSend, csrf_token: str, cookies: List[List[str]]
+) -> str:
+    form_data = {
+        "csrf_token": csrf_token,
+        "recipients": sms.recipient,
+        "message_body": sms.message,
+    }
+    client = get_client(key)
+    client.cookies.update(dict(cookies))
+    send_response = await client.post(
+        f"{SITE_BASE_URL}/scripts/sms_send.php", data=form_data
     )
+    await _check_logged_in(key, send_response)
+
+    return send_response.text
+
+
+async def get_account_info(key: str) -> Account:
+    """
+    Get current account info.
+
+    Results are cached for ACCOUNT_CACHE_TTL seconds.
+
+    :param str key: Authentication key.
+    :return: Account info.
+    """
+
+    cache_key = f"account:{digest(key)}"
+    account = await _response_cache.get(cache_key)
+    if account is None:
+        document = (await get_page(key, "/index.php?page=7")).document
+        with EXTRACT_SECONDS.labels("account").time():
+            account = _parse_account(document)
+        await _response_cache.set(cache_key, account, ACCOUNT_CACHE_TTL)
+
+    return account
 
 
-def get_balance(key: str) -> Balance:
+async def get_balance(key: str) -> Balance:
     """
     Get account balance.
 
@@ -180,129 +442,469 @@ def get_balance(key: str) -> Balance:
     :return: Balance.
     """
 
-    session = get_session(key)
-    form_user_action = bs(session.get(SITE_BASE_URL).text, "html.parser").find(
-        "form", {"name": "user_action"}
-    )
+    document = (await get_page(key, "/")).document
+    with EXTRACT_SECONDS.labels("balance").time():
+        balance = _parse_balance(document)
+    await _credit_cache.set(digest(key), balance.credit)
 
-    return Balance(
-        credit=form_user_action.find("span", {"class": "xxlarge dark english"}).text,
-        amount=form_user_action.find("span", {"class": "dark english"}).text,
+    return balance
+
+
+async def get_balance_history(
+    key: str,
+    limit: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """
+    Get account balance history, newest first.
+
+    The full history is cached for BALANCE_HISTORY_CACHE_TTL seconds and
+    filtered per call.
+
+    :param str key: Authentication key.
+    :param Optional[int] limit: Maximum number of items.
+    :param Optional[datetime] since: Skip items older than this date.
+    :param Optional[datetime] until: Skip items newer than this date.
+    :return: List of BalanceHistoryRows.
+    """
+
+    cache_key = f"balance_history:{digest(key)}"
+    history = await _response_cache.get(cache_key)
+    if history is None:
+        document = (await get_page(key, "/index.php?page=16&lang=en")).document
+        with EXTRACT_SECONDS.labels("balance_history").time():
+            history = tuple(_parse_balance_history(document))
+        ITEMS_PARSED.labels("balance_history").inc(len(history))
+        await _response_cache.set(cache_key, history, BALANCE_HISTORY_CACHE_TTL)
+
+    return list(
+        _history_window(
+            history,
+            limit,
+            _local_time(since),
+            _local_time(until),
+        )
     )
 
 
-def get_balance_history(key: str):
+async def get_sms_history(
+    key: str,
+    limit: Optional[int] = None,
+    page: int = 1,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
     """
-    Get account balance history.
+    Get SMS history, newest first.
 
     :param str key: Authentication key.
-    :return: List of BalanceHistoryItems.
+    :param Optional[int] limit: Maximum number of items.
+    :param int page: History page to start from.
+    :param Optional[datetime] since: Skip items older than this date.
+    :param Optional[datetime] until: Skip items newer than this date.
+    :return: List of SMSHistoryRows.
     """
 
-    session = get_session(key)
+    return [item async for item in iter_sms_history(key, limit, page, since, until)]
 
-    response = session.get(f"{SITE_BASE_URL}/index.php?page=16&lang=en")
-    response.encoding = "utf-8"
-    soup = bs(response.text, "html.parser")
 
-    div_left_side = soup.find("div", {"class": "left_side"})
-    divs = div_left_side.find_all("div")
+async def iter_sms_history(
+    key: str,
+    limit: Optional[int] = None,
+    page: int = 1,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> AsyncIterator[SMSHistoryRow]:
+    """
+    Iterate SMS history page by page, newest first.
 
-    last_date = None
-    items = []
-    for div in divs:
-        if div.has_attr("class"):
-            classes = div["class"]
-            if "date_separator" in classes:
-                last_date = div.text
-            elif "box_div" in classes:
-                row = div.find("tr")
-                time = row.find("td", {"class": "msg_date"}).text
-                amount_parts = row.find(
-                    "td", {"class": "credit_list_amount"}
-                ).text.split(" ")
-
-                item = BalanceHistoryItem(
-                    date=datetime.strptime(f"{last_date} {time}", "%d %B %Y %H:%M:%S"),
-                    message=row.find("td", {"class": "msg_body"}).text,
-                    amount=int(amount_parts[1]),
-                    charge=amount_parts[0] == "-",
-                )
-
-                items.append(item)
+    Upstream pages are only requested while the requested window is not
+    complete, so e.g. the latest 20 messages cost a single page. When the
+    local history store is enabled, history starting from the first page is
+    synced incrementally and served from the store instead.
 
-    return items
+    :param str key: Authentication key.
+    :param Optional[int] limit: Maximum number of items.
+    :param int page: History page to start from.
+    :param Optional[datetime] since: Skip items older than this date.
+    :param Optional[datetime] until: Skip items newer than this date.
+    :return: SMSHistoryRows iterator.
+    """
+
+    since, until = _local_time(since), _local_time(until)
+    if limit == 0:
+        return
+
+    store = _get_sms_history_store()
+    if store is not None and page == 1:
+        await sync_sms_history(key)
+        for item in await run_in_threadpool(
+            store.query, digest(key), limit, since, until
+        ):
+            yield item
+        return
+
+    count = 0
+    pages = _iter_sms_history_pages(
+        key, page, ramp_up=limit is not None or since is not None
+    )
+    try:
+        async for items in pages:
+            for item in items:
+                if until is not None and item.date > until:
+                    continue
+                if since is not None and item.date < since:
+                    return
 
+                yield item
 
-def get_sms_history(key: str):
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+    finally:
+        await pages.aclose()
+
+
+async def sync_sms_history(key: str) -> None:
     """
-    Get SMS history.
+    Bring the local SMS history store up to date.
+
+    The first sync stores the whole history. Later syncs fetch pages from
+    newest backward only until a page containing an already stored message,
+    which also refreshes delivery status of the most recent messages.
+    Concurrent syncs of the same account share one run.
 
     :param str key: Authentication key.
-    :return: List of SMSHistoryItems.
     """
 
-    session = get_session(key)
+    store = _get_sms_history_store()
+    if store is None:
+        return
+
+    account = digest(key)
+
+    async def sync() -> None:
+        incremental = await run_in_threadpool(store.is_complete, account)
+        fetched = []
+        full = True
+        pages = _iter_sms_history_pages(key, 1, ramp_up=incremental)
+        try:
+            async for items in pages:
+                fetched.extend(items)
+                if incremental and await run_in_threadpool(
+                    store.contains_any, account, [item.id for item in items]
+                ):
+                    full = False
+                    break
+        finally:
+            await pages.aclose()
+
+        await run_in_threadpool(store.merge, account, fetched, full)
+
+    await _upstream_flight.do(("sync_sms_history", account), sync)
+
+
+def close_sms_history_store() -> None:
+    """
+    Close the local SMS history store, if open.
+    """
+
+    global _sms_history_store  # pylint: disable=W0603
+
+    if _sms_history_store is not None:
+        _sms_history_store.close()
+        _sms_history_store = None
 
-    url = f"{SITE_BASE_URL}/index.php?page=10&lang=en"
-    response = session.get(url)
-    pages = bs(response.text, "html.parser").find_all("span", {"class": "page_number"})
-    items = _parse_sms_history_items(response)
 
-    if len(pages) != 0:
-        del pages[0]
-        for page in pages:
-            items = items + _parse_sms_history_items(
-                session.post(url, {"cur_page": page.text})
+def _get_sms_history_store() -> Optional[SMSHistoryStore]:
+    global _sms_history_store  # pylint: disable=W0603
+
+    if _sms_history_store is None and SMS_HISTORY_DATABASE:
+        _sms_history_store = SMSHistoryStore(SMS_HISTORY_DATABASE)
+
+    return _sms_history_store
+
+
+async def _iter_sms_history_pages(
+    key: str, page: int, ramp_up: bool = False
+) -> AsyncIterator[List[SMSHistoryRow]]:
+    """
+    Iterate parsed SMS history pages starting from given page.
+
+    Following pages are fetched and parsed ahead of the consumer, at most
+    SMS_HISTORY_CONCURRENCY at a time; the look-ahead is cancelled when the
+    consumer stops early. With ramp_up the look-ahead starts at one page and
+    doubles with every consumed page, for consumers likely to stop early.
+    """
+
+    path = "/index.php?page=10&lang=en"
+    client = get_client(key)
+
+    async def fetch(page_number: str) -> str:
+        response = await client.post(
+            f"{SITE_BASE_URL}{path}",
+            data={"cur_page": page_number},
+            extensions={"idempotent": True},
+        )
+        await _check_logged_in(key, response, _PAGE_MARKERS[path])
+        response.encoding = "utf-8"
+
+        return response.text
+
+    async def fetch_items(page_number: str) -> List[SMSHistoryRow]:
+        async def fetch_and_parse() -> List[SMSHistoryRow]:
+            return await run_in_threadpool(
+                _parse_sms_history_page, await fetch(page_number)
             )
 
-    return items
+        return await _upstream_flight.do(
+            (digest(key), path, page_number), fetch_and_parse
+        )
+
+    if page == 1:
+        document = (await get_page(key, path)).document
+    else:
+        document = parse_html(await fetch(str(page)))
+
+    following = iter(
+        [
+            span.text
+            for span in document.select("span.page_number")
+            if span.text.isdigit() and int(span.text) > page
+        ]
+    )
 
+    yield _extract_sms_history(document)
 
-def remove_sms_from_history(sms_id: int, key: str):
+    tasks = deque()
+    lookahead = 1 if ramp_up else SMS_HISTORY_CONCURRENCY
+    try:
+        while True:
+            while len(tasks) < lookahead:
+                page_number = next(following, None)
+                if page_number is None:
+                    break
+                tasks.append(asyncio.ensure_future(fetch_items(page_number)))
+
+            if not tasks:
+                break
+
+            yield await tasks.popleft()
+            lookahead = min(lookahead * 2, SMS_HISTORY_CONCURRENCY)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def remove_sms_from_history(sms_id: int, key: str):
     """
     Remove SMS from history.
 
     :param int sms_id: SMS ID to remove.
     :param str key: Authentication key.
-    :return: List of SMSHistoryItems.
+    :return: List of SMSHistoryRows.
     """
 
-    session = get_session(key)
-    response = session.post(
+    client = get_client(key)
+    response = await client.post(
         f"{SITE_BASE_URL}/scripts/delete_message.php",
-        {"type": "single", "msg_id": sms_id},
+        data={"type": "single", "msg_id": sms_id},
     )
+    await _check_logged_in(key, response)
 
-    return response.status_code == 200 and response.text == "success"
+    removed = response.status_code == 200 and response.text == "success"
+    if removed:
+        await invalidate_response_cache(key)
+        store = _get_sms_history_store()
+        if store is not None:
+            await run_in_threadpool(store.delete, digest(key), sms_id)
 
+    return removed
 
-def _parse_sms_history_items(response):
-    response.encoding = "utf-8"
-    soup = bs(response.text, "html.parser")
-    messages = soup.find("div", {"id": "message_list"})
-
-    items = []
-    if messages:
-        for message in messages:
-            body = message.find("td", {"class": "msg_body"})
-            date = datetime.strptime(
-                message.find("td", {"class": "msg_date"}).text, "%d%b%Y%H:%M:%S"
-            )
-            recipient = (
-                body.find("p", {"class": "message_list_recipient"})
-                .find_all("span", {"class": "red"})[1]
-                .text
+
+async def remove_bulk_sms_from_history(
+    key: str,
+    sms_ids: List[int],
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[SMSHistoryItemBulkRemoveStatus]:
+    """
+    Remove multiple SMSs from history, at most SMS_DELETE_CONCURRENCY at a time.
+
+    With since or until, messages sent in that date range are removed too.
+
+    :param str key: Authentication key.
+    :param List[int] sms_ids: SMS IDs to remove.
+    :param Optional[datetime] since: Remove messages sent since this date.
+    :param Optional[datetime] until: Remove messages sent until this date.
+    :return: Removal statuses, in the same order as the IDs.
+    """
+
+    if since is not None or until is not None:
+        sms_ids = list(sms_ids) + [
+            item.id async for item in iter_sms_history(key, since=since, until=until)
+        ]
+
+    semaphore = asyncio.Semaphore(SMS_DELETE_CONCURRENCY)
+
+    async def remove(sms_id: int) -> SMSHistoryItemBulkRemoveStatus:
+        async with semaphore:
+            return SMSHistoryItemBulkRemoveStatus(
+                id=sms_id, status=await remove_sms_from_history(sms_id, key)
             )
 
-            item = SMSHistoryItem(
-                id=message["id"][4:],
-                date=date,
-                recipient=recipient,
-                text=body.find("p", {"class": "msg_text"}).text,
-                delivered=("msg_sent" in message["class"]),
+    return list(
+        await asyncio.gather(*(remove(sms_id) for sms_id in dict.fromkeys(sms_ids)))
+    )
+
+
+async def _check_logged_in(
+    key: str, response: httpx.Response, marker: Optional[Pattern[bytes]] = None
+) -> None:
+    """
+    Raise 401 when upstream rejected the Authentication Key.
+
+    Pages of a rejected key come back as the logged-out page with status 200,
+    so they are told apart by the missing marker of the page (_PAGE_MARKERS),
+    before anything is parsed or cached.
+    """
+
+    if (
+        response.status_code == 401
+        or response.content == b"not_logged_in"
+        or (marker is not None and not marker.search(response.content))
+    ):
+        await invalidate_auth_key(key)
+        raise HTTPException(status_code=401)
+
+
+def _credentials_digest(username: str, password: str) -> str:
+    return hmac.new(
+        str(SECRET_KEY).encode("utf-8"),
+        f"{username}\0{password}".encode("utf-8"),
+        hashlib.sha256,
+    ).hexdigest()
+
+
+def _parse_csrf_token(document: Node) -> str:
+    return document.select_one('input[name="csrf_token"]').attr("value")
+
+
+def _parse_account(document: Node) -> Account:
+    day = document.select_one("select#day option[selected]").text
+    month = document.select_one("select#month option[selected]").text
+    year = document.select_one("select#year option[selected]").text
+
+    birthdate = None
+    if day and month and year:
+        birthdate = datetime(int(year), GEORGIAN_MONTHS[month], int(day))
+
+    return Account(
+        first_name=document.select_one("input#f_name").attr("value"),
+        last_name=document.select_one("input#l_name").attr("value"),
+        username=document.select_one("input#user_name").attr("value"),
+        phone=document.select_one(
+            'input[class="round_border large_box"][disabled]'
+        ).attr("value"),
+        city=document.select_one("select#city option[selected]").text.strip(),
+        birthdate=birthdate,
+        gender=Gender.FEMALE
+        if document.select_one("input#female[checked]")
+        else Gender.MALE,
+    )
+
+
+def _parse_balance(document: Node) -> Balance:
+    form_user_action = document.select_one('form[name="user_action"]')
+
+    return Balance(
+        credit=form_user_action.select_one('span[class="xxlarge dark english"]').text,
+        amount=form_user_action.select_one('span[class="dark english"]').text,
+    )
+
+
+def _parse_balance_history(document: Node) -> Iterator[BalanceHistoryRow]:
+    divs = document.select(
+        "div.left_side div.date_separator, div.left_side div.box_div"
+    )
+
+    last_date = None
+    for div in divs:
+        if "date_separator" in div.attr("class").split():
+            last_date = div.text
+        else:
+            time = div.select_one("tr td.msg_date").text
+            amount_parts = div.select_one("tr td.credit_list_amount").text.split(" ")
+
+            item = BalanceHistoryRow(
+                date=parse_datetime(last_date, time),
+                message=div.select_one("tr td.msg_body").text,
+                amount=int(amount_parts[1]),
+                charge=amount_parts[0] == "-",
             )
 
-            items.append(item)
+            yield item
+
+
+def _history_window(
+    items: Iterable[BalanceHistoryRow],
+    limit: Optional[int],
+    since: Optional[datetime],
+    until: Optional[datetime],
+) -> Iterator[BalanceHistoryRow]:
+    if limit == 0:
+        return
+
+    count = 0
+    for item in items:
+        if until is not None and item.date > until:
+            continue
+        if since is not None and item.date < since:
+            return
+
+        yield item
+
+        count += 1
+        if limit is not None and count >= limit:
+            return
+
+
+def _local_time(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Convert timezone aware date to the naive Georgian local time used upstream.
+    """
+
+    if value is None or value.tzinfo is None:
+        return value
+
+    return value.astimezone(GEORGIA_TIMEZONE).replace(tzinfo=None)
+
+
+def _parse_sms_history_page(text: str) -> List[SMSHistoryRow]:
+    return _extract_sms_history(parse_html(text))
+
+
+def _extract_sms_history(document: Node) -> List[SMSHistoryRow]:
+    with EXTRACT_SECONDS.labels("sms_history").time():
+        items = list(_parse_sms_history_items(document))
+    ITEMS_PARSED.labels("sms_history").inc(len(items))
 
     return items
+
+
+def _parse_sms_history_items(document: Node) -> Iterator[SMSHistoryRow]:
+    for message in document.select("div#message_list > *"):
+        body = message.select_one("td.msg_body")
+        date = parse_compact_datetime(message.select_one("td.msg_date").text)
+        recipient = body.select("p.message_list_recipient span.red")[1].text
+
+        item = SMSHistoryRow(
+            id=int(message.attr("id")[4:]),
+            date=date,
+            recipient=recipient,
+            text=body.select_one("p.msg_text").text,
+            delivered=("msg_sent" in message.attr("class").split()),
+        )
+
+        yield item
@@ -0,0 +1,198 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+import threading
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from app.models.domain.history import SMSHistoryRow
+
+
+class SMSHistoryStore:
+    """
+    Local SQLite copy of SMS history, per account.
+
+    Accounts are identified by a digest of the Authentication Key. An account
+    is "complete" once its whole history has been stored, after which only
+    the newest upstream pages need to be merged in. Methods block; call them
+    from a worker thread. The connection is shared, so calls are serialized.
+    """
+
+    def __init__(self, path: str):
+        import sqlite3  # pylint: disable=C0415
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS sms_history ("
+            "account TEXT, id INTEGER, date TEXT, recipient TEXT, text TEXT, "
+            "delivered INTEGER, PRIMARY KEY (account, id))"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS sms_history_date "
+            "ON sms_history (account, date DESC, id DESC)"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS sms_history_sync ("
+            "account TEXT PRIMARY KEY, synced_at TEXT)"
+        )
+        self._connection.commit()
+
+    def is_complete(self, account: str) -> bool:
+        """
+        Check whether the whole history of given account is stored.
+
+        :param str account: Account digest.
+        :return: Whether the history is complete.
+        """
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM sms_history_sync WHERE account = ?", (account,)
+            ).fetchone()
+
+        return row is not None
+
+    def contains_any(self, account: str, ids: Iterable[int]) -> bool:
+        """
+        Check whether any of given messages is already stored.
+
+        :param str account: Account digest.
+        :param Iterable[int] ids: Message IDs.
+        :return: Whether any message is known.
+        """
+
+        ids = list(ids)
+        if not ids:
+            return False
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM sms_history WHERE account = ? AND id IN "
+                f"({','.join('?' * len(ids))}) LIMIT 1",
+                (account, *ids),
+            ).fetchone()
+
+        return row is not None
+
+    def merge(self, account: str, items: List[SMSHistoryRow], full: bool) -> None:
+        """
+        Merge newest history items fetched from upstream.
+
+        Stored messages inside the fetched date range that upstream no longer
+        lists are removed; with full, everything not fetched is removed and
+        the account is marked complete. Delivery status of fetched messages is
+        overwritten.
+
+        :param str account: Account digest.
+        :param List[SMSHistoryRow] items: Fetched items, newest first.
+        :param bool full: Whether items are the whole history.
+        """
+
+        with self._lock, self._connection:
+            if full or not items:
+                self._connection.execute(
+                    "DELETE FROM sms_history WHERE account = ?", (account,)
+                )
+            else:
+                self._connection.execute(
+                    "DELETE FROM sms_history WHERE account = ? AND date > ? AND id "
+                    f"NOT IN ({','.join('?' * len(items))})",
+                    (account, items[-1].date.isoformat(), *(item.id for item in items)),
+                )
+
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO sms_history VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        account,
+                        item.id,
+                        item.date.isoformat(),
+                        item.recipient,
+                        item.text,
+                        item.delivered,
+                    )
+                    for item in items
+                ),
+            )
+
+            if full:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO sms_history_sync VALUES (?, ?)",
+                    (account, datetime.utcnow().isoformat()),
+                )
+
+    def query(
+        self,
+        account: str,
+        limit: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[SMSHistoryRow]:
+        """
+        Get stored history items, newest first.
+
+        :param str account: Account digest.
+        :param Optional[int] limit: Maximum number of items.
+        :param Optional[datetime] since: Skip items older than this date.
+        :param Optional[datetime] until: Skip items newer than this date.
+        :return: List of SMSHistoryRows.
+        """
+
+        sql = "SELECT id, date, recipient, text, delivered FROM sms_history "
+        sql += "WHERE account = ?"
+        parameters = [account]
+        if since is not None:
+            sql += " AND date >= ?"
+            parameters.append(since.isoformat())
+        if until is not None:
+            sql += " AND date <= ?"
+            parameters.append(until.isoformat())
+        sql += " ORDER BY date DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+
+        with self._lock:
+            rows = self._connection.execute(sql, parameters).fetchall()
+
+        return [
+            SMSHistoryRow(
+                id=row[0],
+                date=datetime.fromisoformat(row[1]),
+                recipient=row[2],
+                text=row[3],
+                delivered=bool(row[4]),
+            )
+            for row in rows
+        ]
+
+    def delete(self, account: str, sms_id: int) -> None:
+        """
+        Remove message from stored history.
+
+        :param str account: Account digest.
+        :param int sms_id: Message ID.
+        """
+
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM sms_history WHERE account = ? AND id = ?",
+                (account, sms_id),
+            )
+
+    def close(self) -> None:
+        """
+        Close database connection.
+        """
+
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,172 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List, Tuple
+
+
+def import_times() -> List[Tuple[str, int, int]]:
+    """
+    Import the app in a fresh interpreter under -X importtime.
+
+    :return: Module, self and cumulative microseconds, in import order.
+    """
+
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    modules = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, module = line[len("import time:") :].split("|")
+        modules.append((module.strip(), int(own), int(cumulative)))
+
+    return modules
+
+
+def report_imports(top: int) -> None:
+    """
+    Print where import time of the app goes.
+
+    :param int top: Number of packages and app modules to list.
+    """
+
+    modules = import_times()
+    packages = defaultdict(int)
+    for module, own, _ in modules:
+        packages[module.split(".")[0]] += own
+
+    print(f"import app.main: {sum(packages.values()) / 1000:.1f} ms")
+    print(f"\n{'package':<28}{'self ms':>10}")
+    for package, own in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"{package:<28}{own / 1000:>10.1f}")
+
+    print(f"\n{'app module':<40}{'self ms':>10}{'cumulative':>12}")
+    app_modules = [entry for entry in modules if entry[0].startswith("app.")]
+    for module, own, cumulative in sorted(app_modules, key=lambda item: -item[2])[:top]:
+        print(f"{module:<40}{own / 1000:>10.1f}{cumulative / 1000:>12.1f}")
+
+
+async def child() -> Dict[str, float]:
+    """
+    Import the app, run startup and call /balance/ once, in this process.
+
+    :return: Milliseconds spent on each step.
+    """
+
+    # Nothing but the standard library is imported before the app, so the
+    # app is charged for everything it pulls in.
+    # pylint: disable=C0415
+    started = time.perf_counter()
+    from app.main import app
+
+    imported = time.perf_counter()
+    import httpx
+
+    await app.router.startup()
+    ready = time.perf_counter()
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://api"
+    ) as client:
+        response = await client.get(
+            "/balance/",
+            headers={"Authorization": f"Bearer {os.environ['BENCHMARK_TOKEN']}"},
+        )
+        response.raise_for_status()
+    answered = time.perf_counter()
+
+    await app.router.shutdown()
+
+    return {
+        "import_ms": (imported - started) * 1000,
+        "startup_ms": (ready - imported) * 1000,
+        "first_request_ms": (answered - ready) * 1000,
+    }
+
+
+def measure(runs: int) -> Dict[str, float]:
+    """
+    Time fresh processes from launch to the first /balance/ response.
+
+    :param int runs: Number of processes to launch.
+    :return: Median milliseconds of each step and of the whole process.
+    """
+
+    # pylint: disable=C0415
+    from app.services.jwt import create_access_token
+    from benchmarks.fake_magtifun import VALID_KEY
+
+    env = dict(
+        os.environ,
+        BENCHMARK_TOKEN=create_access_token({"sub": VALID_KEY}, timedelta(minutes=30)),
+    )
+    timings = defaultdict(list)
+    for _ in range(runs):
+        started = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, "-m", "benchmarks.coldstart", "--child"],
+            capture_output=True,
+            text=True,
+            env=env,
+            check=True,
+        )
+        timings["process_ms"].append((time.perf_counter() - started) * 1000)
+        for name, value in json.loads(process.stdout).items():
+            timings[name].append(value)
+
+    return {name: statistics.median(values) for name, values in timings.items()}
+
+
+def main():
+    """
+    Benchmark entry point.
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Import time of the app and latency of the first /balance/ call."
+    )
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=12)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(child())))
+        return
+
+    # pylint: disable=C0415
+    from benchmarks.fake_magtifun import serve_in_process
+
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ["MAGTIFUN_BASE_URL"] = serve_in_process()
+
+    report_imports(args.top)
+
+    print(f"\ncold start, median of {args.runs} processes:")
+    for name, value in measure(args.runs).items():
+        print(f"{name:<20}{value:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+# pylint: disable=W0212
+
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Tuple
+
+from app.services import dates
+from app.services.dates import parse_compact_datetime, parse_datetime
+
+FIRST_DATE = datetime(2021, 10, 5, 12, 30)
+
+
+def balance_rows(rows: int) -> List[Tuple[str, str]]:
+    """
+    Render balance history dates: date separator and row time.
+
+    :param int rows: Row count.
+    :return: Day and time of every row.
+    """
+
+    moments = [FIRST_DATE - timedelta(minutes=211 * index) for index in range(rows)]
+
+    return [(f"{date:%d %B %Y}", f"{date:%H:%M:%S}") for date in moments]
+
+
+def sms_rows(rows: int) -> List[str]:
+    """
+    Render SMS history dates.
+
+    :param int rows: Row count.
+    :return: Date of every row.
+    """
+
+    moments = [FIRST_DATE - timedelta(minutes=37 * index) for index in range(rows)]
+
+    return [f"{date:%d%b%Y%H:%M:%S}" for date in moments]
+
+
+def measure(parse: Callable[[], List[datetime]], iterations: int) -> float:
+    """
+    Measure one pass over all rows.
+
+    :param parse: Function parsing all rows.
+    :param int iterations: Timed passes.
+    :return: Best milliseconds per pass, starting with an empty day cache.
+    """
+
+    best = float("inf")
+    for _ in range(iterations):
+        dates._iso_day.cache_clear()
+        started = time.perf_counter()
+        parse()
+        best = min(best, time.perf_counter() - started)
+
+    return best * 1000
+
+
+def main():
+    """
+    Benchmark entry point.
+    """
+
+    parser = argparse.ArgumentParser(
+        description="History date parsing: datetime.strptime vs. app.services.dates."
+    )
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--iterations", type=int, default=10)
+    args = parser.parse_args()
+
+    balance = balance_rows(args.rows)
+    sms = sms_rows(args.rows)
+    cases = {
+        "balance history": (
+            lambda: [
+                datetime.strptime(f"{day} {time_}", "%d %B %Y %H:%M:%S")
+                for day, time_ in balance
+            ],
+            lambda: [parse_datetime(day, time_) for day, time_ in balance],
+        ),
+        "sms history": (
+            lambda: [datetime.strptime(text, "%d%b%Y%H:%M:%S") for text in sms],
+            lambda: [parse_compact_datetime(text) for text in sms],
+        ),
+    }
+
+    print(f"{args.rows} rows, best of {args.iterations} passes")
+    print(f"{'rows':<18}{'strptime ms':>13}{'dates ms':>11}{'speedup':>9}")
+    for name, (baseline, fast) in cases.items():
+        assert baseline() == fast(), name
+        baseline_ms = measure(baseline, args.iterations)
+        fast_ms = measure(fast, args.iterations)
+        print(
+            f"{name:<18}{baseline_ms:>13.2f}{fast_ms:>11.2f}"
+            f"{baseline_ms / fast_ms:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
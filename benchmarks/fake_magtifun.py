@@ -0,0 +1,345 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+import asyncio
+import multiprocessing
+import random
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import ClientDisconnect, Request
+from starlette.responses import HTMLResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+USERNAME = "benchmark"
+PASSWORD = "benchmark"
+VALID_KEY = "benchmark-key"
+CSRF_TOKEN = "0123456789abcdef"
+
+_FIRST_DATE = datetime(2021, 10, 5, 12, 30, 0)
+_MONTHS = (
+    "იანვარი",
+    "თებერვალი",
+    "მარტი",
+    "აპრილი",
+    "მაისი",
+    "ივნისი",
+    "ივლისი",
+    "აგვისტო",
+    "სექტემბერი",
+    "ოქტომბერი",
+    "ნოემბერი",
+    "დეკემბერი",
+)
+
+
+def _layout(content: str) -> str:
+    menu = "".join(
+        f'<li><a href="index.php?page={i}">Menu item {i}</a></li>' for i in range(40)
+    )
+
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>MagtiFun</title>'
+        "</head><body>"
+        f'<div id="header"><ul class="menu">{menu}</ul></div>'
+        '<form name="login_form" method="post" action="index.php?page=11">'
+        f'<input type="hidden" name="csrf_token" value="{CSRF_TOKEN}"/></form>'
+        f'<div id="content">{content}</div>'
+        '<div id="footer"><p class="copyright">© MagtiCom</p></div>'
+        "</body></html>"
+    )
+
+
+def render_home(logged_in: bool, credit: int = 50, amount: int = 5) -> str:
+    """
+    Render home page (index).
+
+    :param bool logged_in: Whether to render the authenticated variant.
+    :param int credit: Credit count.
+    :param int amount: Money amount.
+    :return: HTML.
+    """
+
+    if not logged_in:
+        return _layout('<p class="welcome">Welcome</p>')
+
+    return _layout(
+        '<form name="user_action" method="post">'
+        f'<p>თქვენს ანგარიშზეა <span class="xxlarge dark english">{credit}</span>'
+        " კრედიტი</p>"
+        f'<p>ბალანსი: <span class="dark english">{amount}</span> ლარი</p>'
+        "</form>"
+    )
+
+
+def render_sms_form() -> str:
+    """
+    Render SMS send form page (page=2).
+
+    :return: HTML.
+    """
+
+    return _layout(
+        '<form name="sms_form"><textarea name="message_body"></textarea></form>'
+    )
+
+
+def render_account(gender: str = "male") -> str:
+    """
+    Render account settings page (page=7).
+
+    :param str gender: Selected gender.
+    :return: HTML.
+    """
+
+    def select(name: str, values, selected) -> str:
+        options = "".join(
+            f'<option value="{value}"{" selected" if value == selected else ""}>'
+            f"{value}</option>"
+            for value in values
+        )
+
+        return f'<select id="{name}" name="{name}">{options}</select>'
+
+    return _layout(
+        '<form name="account">'
+        '<input id="f_name" type="text" value="John"/>'
+        '<input id="l_name" type="text" value="Doe"/>'
+        '<input id="user_name" type="text" value="john.doe"/>'
+        '<input class="round_border large_box" type="text" value="599123456" disabled/>'
+        + select("city", ("ბათუმი", "თბილისი", "ქუთაისი"), "თბილისი")
+        + select("day", [str(i) for i in range(1, 32)], "1")
+        + select("month", _MONTHS, "იანვარი")
+        + select("year", [str(i) for i in range(1930, 2021)], "1970")
+        + '<input id="male" type="radio" name="gender"'
+        + (" checked" if gender == "male" else "")
+        + '/><input id="female" type="radio" name="gender"'
+        + (" checked" if gender == "female" else "")
+        + "/></form>"
+    )
+
+
+def render_sms_history(page: int, pages: int, per_page: int) -> str:
+    """
+    Render one page of SMS history (page=10).
+
+    :param int page: Current page number, starting from 1.
+    :param int pages: Total page count.
+    :param int per_page: Messages per page.
+    :return: HTML.
+    """
+
+    pagination = ""
+    if pages > 1:
+        pagination = "".join(
+            f'<span class="page_number">{i}</span>' for i in range(1, pages + 1)
+        )
+
+    messages = []
+    for index in range((page - 1) * per_page, page * per_page):
+        msg_id = 10_000_000 - index
+        date = _FIRST_DATE - timedelta(minutes=37 * index)
+        status = "msg_sent" if index % 3 else "msg_pending"
+        messages.append(
+            f'<div id="msg_{msg_id}" class="message_list_item {status}"><table><tr>'
+            '<td class="msg_body"><p class="message_list_recipient">'
+            f'<span class="red">To:</span> <span class="red">5991{index % 100000:05d}'
+            "</span></p>"
+            f'<p class="msg_text">Benchmark message number {index}</p></td>'
+            f'<td class="msg_date">{date:%d}<br/>{date:%b}<br/>{date:%Y}<br/>'
+            f"{date:%H:%M:%S}</td></tr></table></div>"
+        )
+
+    return _layout(
+        f'<div class="pagination">{pagination}</div>'
+        f'<div id="message_list">{"".join(messages)}</div>'
+    )
+
+
+def render_balance_history(rows: int) -> str:
+    """
+    Render balance history page (page=16).
+
+    :param int rows: History row count.
+    :return: HTML.
+    """
+
+    parts = []
+    last_date = None
+    for index in range(rows):
+        date = _FIRST_DATE - timedelta(minutes=211 * index)
+        if date.date() != last_date:
+            last_date = date.date()
+            parts.append(f'<div class="date_separator">{date:%d %B %Y}</div>')
+        sign, amount = ("-", 1) if index % 4 else ("+", 50)
+        parts.append(
+            '<div class="box_div"><table><tr>'
+            f'<td class="msg_date">{date:%H:%M:%S}</td>'
+            f'<td class="msg_body">Benchmark charge number {index}</td>'
+            f'<td class="credit_list_amount">{sign} {amount}</td>'
+            "</tr></table></div>"
+        )
+
+    return _layout(f'<div class="left_side">{"".join(parts)}</div>')
+
+
+class Faults(NamedTuple):
+    """
+    Upstream failures to simulate.
+
+    error_rate is the share of requests answered with 500, stall_rate the
+    share of requests delayed by stall seconds.
+    """
+
+    error_rate: float = 0.0
+    stall_rate: float = 0.0
+    stall: float = 30.0
+
+
+def create_app(
+    latency: float = 0.0,
+    sms_pages: int = 5,
+    sms_per_page: int = 20,
+    balance_rows: int = 100,
+    faults: Faults = Faults(),
+) -> Starlette:
+    """
+    Create fake magtifun.ge ASGI application.
+
+    :param float latency: Delay in seconds added to every response.
+    :param int sms_pages: SMS history page count.
+    :param int sms_per_page: SMS history messages per page.
+    :param int balance_rows: Balance history row count.
+    :param Faults faults: Upstream failures to simulate.
+    :return: ASGI application.
+    """
+
+    async def inject_faults(request: Request, call_next) -> Response:
+        if random.random() < faults.error_rate:
+            return PlainTextResponse("Internal Server Error", status_code=500)
+        if random.random() < faults.stall_rate:
+            await asyncio.sleep(faults.stall)
+
+        return await call_next(request)
+
+    async def delay():
+        if latency:
+            await asyncio.sleep(latency)
+
+    def logged_in(request: Request) -> bool:
+        return request.cookies.get("User") == VALID_KEY
+
+    async def home(request: Request) -> Response:
+        await delay()
+        return HTMLResponse(render_home(logged_in(request)))
+
+    async def index(request: Request) -> Response:
+        await delay()
+        page = request.query_params.get("page")
+        try:
+            form = await request.form() if request.method == "POST" else {}
+        except ClientDisconnect:
+            return Response(status_code=499)
+
+        if page == "11":
+            response = HTMLResponse(render_home(False))
+            if form.get("user") == USERNAME and form.get("password") == PASSWORD:
+                response = HTMLResponse(render_home(True))
+                response.set_cookie("User", VALID_KEY)
+            return response
+
+        if not logged_in(request):
+            return HTMLResponse(render_home(False))
+
+        return HTMLResponse(render_page(page, form))
+
+    def render_page(page: str, form) -> str:
+        if page == "2":
+            return render_sms_form()
+        if page == "7":
+            return render_account()
+        if page == "10":
+            current = int(form.get("cur_page", 1))
+            return render_sms_history(current, sms_pages, sms_per_page)
+        if page == "16":
+            return render_balance_history(balance_rows)
+
+        return render_home(True)
+
+    async def sms_send(request: Request) -> Response:
+        await delay()
+        if not logged_in(request):
+            return PlainTextResponse("not_logged_in")
+
+        form = await request.form()
+        if form.get("csrf_token") != CSRF_TOKEN:
+            return PlainTextResponse("default")
+
+        return PlainTextResponse("success")
+
+    async def delete_message(request: Request) -> Response:
+        await delay()
+        if not logged_in(request):
+            return PlainTextResponse("not_logged_in")
+
+        return PlainTextResponse("success")
+
+    return Starlette(
+        routes=[
+            Route("/", home),
+            Route("/index.php", index, methods=["GET", "POST"]),
+            Route("/scripts/sms_send.php", sms_send, methods=["POST"]),
+            Route("/scripts/delete_message.php", delete_message, methods=["POST"]),
+        ],
+        middleware=[Middleware(BaseHTTPMiddleware, dispatch=inject_faults)]
+        if faults.error_rate or faults.stall_rate
+        else None,
+    )
+
+
+def serve_in_process(**kwargs) -> str:
+    """
+    Serve fake application on a free local port in a daemon process.
+
+    The server gets its own interpreter so it doesn't compete with the
+    benchmarked application for the GIL.
+
+    :param kwargs: create_app arguments.
+    :return: Base URL of the running server.
+    """
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    multiprocessing.Process(target=_serve, args=(port, kwargs), daemon=True).start()
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+
+    return f"http://127.0.0.1:{port}"
+
+
+def _serve(port: int, kwargs: dict) -> None:
+    uvicorn.run(
+        create_app(**kwargs),
+        host="127.0.0.1",
+        port=port,
+        log_level="warning",
+        backlog=4096,
+    )
@@ -0,0 +1,78 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import Tuple
+
+from benchmarks.fake_magtifun import VALID_KEY, serve_in_process
+
+
+async def measure(base_url: str, repeat: int) -> Tuple[float, float]:
+    """
+    Measure median SMS history latency against given fake server.
+
+    Every run starts from an empty local history store and is followed by an
+    incremental run against the synced store.
+
+    :param str base_url: Fake server URL.
+    :param int repeat: Timed runs.
+    :return: Median seconds of full and incremental runs.
+    """
+
+    # pylint: disable=C0415
+    from app.services import magtifun
+    from app.services.http import close_transport
+
+    magtifun.SITE_BASE_URL = base_url
+    full, incremental = [], []
+    for _ in range(repeat):
+        magtifun.close_sms_history_store()
+        for timings in (full, incremental):
+            started = time.perf_counter()
+            await magtifun.get_sms_history(VALID_KEY)
+            timings.append(time.perf_counter() - started)
+    await close_transport()
+
+    return statistics.median(full), statistics.median(incremental)
+
+
+def main():
+    """
+    Benchmark entry point.
+    """
+
+    parser = argparse.ArgumentParser(
+        description="SMS history latency vs. page count against a fake magtifun.ge."
+    )
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 5, 10, 20, 40])
+    parser.add_argument("--per-page", type=int, default=20)
+    parser.add_argument(
+        "--latency", type=float, default=0.1, help="Upstream latency in seconds."
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("SMS_HISTORY_DATABASE", ":memory:")
+
+    print(f"{'pages':>6}{'full ms':>12}{'synced ms':>12}")
+    for pages in args.pages:
+        base_url = serve_in_process(
+            latency=args.latency, sms_pages=pages, sms_per_page=args.per_page
+        )
+        full, incremental = asyncio.run(measure(base_url, args.repeat))
+        print(f"{pages:>6}{full * 1000:>12.1f}{incremental * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
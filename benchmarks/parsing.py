@@ -0,0 +1,84 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+# pylint: disable=W0212
+
+import argparse
+import os
+import time
+import tracemalloc
+from pathlib import Path
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+# pylint: disable=C0413
+from app.services import magtifun
+from app.services.html import BACKENDS, parse_html
+
+FIXTURES = Path(__file__).parent / "fixtures"
+PAGES = {
+    "home.html": magtifun._parse_balance,
+    "page2.html": magtifun._parse_csrf_token,
+    "page7.html": magtifun._parse_account,
+    "page10.html": lambda document: list(magtifun._parse_sms_history_items(document)),
+    "page16.html": lambda document: list(magtifun._parse_balance_history(document)),
+}
+
+
+def measure(text: str, backend: str, extract, iterations: int):
+    """
+    Measure parse and extraction of one page.
+
+    Peak memory is traced Python heap only; native allocations made inside
+    lxml or selectolax are not visible to tracemalloc.
+
+    :param str text: Page HTML.
+    :param str backend: Parser backend.
+    :param extract: Extraction function.
+    :param int iterations: Timed iterations.
+    :return: Mean milliseconds per page and peak KiB of one page.
+    """
+
+    extract(parse_html(text, backend))
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        extract(parse_html(text, backend))
+    elapsed = (time.perf_counter() - started) / iterations
+
+    tracemalloc.start()
+    extract(parse_html(text, backend))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed * 1000, peak / 1024
+
+
+def main():
+    """
+    Benchmark entry point.
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Parse time and memory per HTML backend over fixture pages."
+    )
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--backend", action="append", choices=BACKENDS)
+    args = parser.parse_args()
+
+    print(f"{'page':<14}{'backend':<12}{'ms/page':>10}{'peak KiB':>12}")
+    for page, extract in PAGES.items():
+        text = (FIXTURES / page).read_text(encoding="utf-8")
+        for backend in args.backend or BACKENDS:
+            milliseconds, kibibytes = measure(text, backend, extract, args.iterations)
+            print(f"{page:<14}{backend:<12}{milliseconds:>10.3f}{kibibytes:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+import argparse
+import os
+from pathlib import Path
+
+import httpx
+
+FIXTURES = Path(__file__).parent / "fixtures"
+PAGES = {
+    "home.html": ("GET", "/", None),
+    "page2.html": ("GET", "/index.php?page=2", None),
+    "page7.html": ("GET", "/index.php?page=7", None),
+    "page10.html": ("POST", "/index.php?page=10&lang=en", {"cur_page": "1"}),
+    "page16.html": ("GET", "/index.php?page=16&lang=en", None),
+}
+
+
+def main():
+    """
+    Record every page the service scrapes into benchmarks/fixtures.
+
+    Recorded pages contain personal account data; review them before
+    committing.
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Record scraped magtifun.ge pages as benchmark fixtures."
+    )
+    parser.add_argument(
+        "--key",
+        default=os.environ.get("MAGTIFUN_KEY"),
+        help="Authentication Key (User cookie), defaults to MAGTIFUN_KEY.",
+    )
+    parser.add_argument("--base-url", default="http://www.magtifun.ge")
+    parser.add_argument("--output", type=Path, default=FIXTURES)
+    args = parser.parse_args()
+
+    if not args.key:
+        parser.error("--key or MAGTIFUN_KEY is required")
+
+    args.output.mkdir(parents=True, exist_ok=True)
+    with httpx.Client(
+        base_url=args.base_url,
+        cookies={"User": args.key},
+        headers={"Referer": args.base_url},
+        follow_redirects=True,
+    ) as client:
+        for name, (method, path, data) in PAGES.items():
+            response = client.request(method, path, data=data)
+            response.raise_for_status()
+            response.encoding = "utf-8"
+            (args.output / name).write_text(response.text, encoding="utf-8")
+            print(f"{name:<14}{len(response.content):>10} bytes")
+
+
+if __name__ == "__main__":
+    main()
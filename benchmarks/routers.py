@@ -0,0 +1,273 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import httpx
+
+from benchmarks.fake_magtifun import PASSWORD, USERNAME, VALID_KEY, serve_in_process
+
+
+class Endpoint(NamedTuple):
+    """
+    API call to benchmark.
+    """
+
+    method: str
+    path: str
+    json: Any = None
+    data: Optional[Dict[str, str]] = None
+
+
+ENDPOINTS = {
+    "auth.token": Endpoint(
+        "POST", "/token", data={"username": USERNAME, "password": PASSWORD}
+    ),
+    "account.info": Endpoint("GET", "/account/"),
+    "balance.get": Endpoint("GET", "/balance/"),
+    "balance.history": Endpoint("GET", "/balance/history"),
+    "sms.history": Endpoint("GET", "/sms/"),
+    "sms.history_page": Endpoint("GET", "/sms/?page=2"),
+    "sms.history_stream": Endpoint("GET", "/sms/?stream=true"),
+    "sms.send": Endpoint(
+        "POST", "/sms/", json={"recipient": "599123456", "message": "Hi"}
+    ),
+    "sms.bulk": Endpoint(
+        "POST", "/sms/bulk", json=[{"recipient": "599123456", "message": "Hi"}] * 10
+    ),
+    "sms.delete": Endpoint("DELETE", "/sms/10000000"),
+    "sms.delete_bulk": Endpoint("DELETE", "/sms/", json={"ids": list(range(10))}),
+    "upstream.pool": Endpoint("GET", "/upstream/pool"),
+    "metrics": Endpoint("GET", "/metrics"),
+}
+
+# Settings that disable every cache, for --cold runs.
+COLD_SETTINGS = {
+    "AUTH_CACHE_TTL": "0",
+    "SESSION_CACHE_TTL": "0",
+    "JWT_CACHE_SIZE": "0",
+    "CSRF_TOKEN_TTL": "0",
+    "CREDIT_CACHE_TTL": "0",
+    "ACCOUNT_CACHE_TTL": "0",
+    "BALANCE_HISTORY_CACHE_TTL": "0",
+    "SMS_HISTORY_DATABASE": "",
+}
+
+
+async def run(iterations: int, warmup: int) -> Dict[str, Dict[str, float]]:
+    """
+    Call every endpoint through the ASGI app, one call per endpoint per round.
+
+    Interleaving endpoints spreads machine noise evenly between them.
+
+    :param int iterations: Timed rounds.
+    :param int warmup: Untimed rounds.
+    :return: Median and p95 milliseconds and upstream requests per call, by endpoint.
+    """
+
+    # pylint: disable=C0415
+    from app.main import app
+    from app.services.http import close_transport
+
+    headers = _auth_headers()
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://api"
+    ) as client:
+        timings = {name: [] for name in ENDPOINTS}
+        upstream = dict.fromkeys(ENDPOINTS, 0)
+        for round_number in range(warmup + iterations):
+            for name, endpoint in ENDPOINTS.items():
+                elapsed, requests = await _call(client, endpoint, headers)
+                if round_number >= warmup:
+                    timings[name].append(elapsed)
+                    upstream[name] += requests
+
+    await close_transport()
+
+    return {
+        name: {
+            "median_ms": statistics.median(values) * 1000,
+            "p95_ms": _percentile(values, 0.95) * 1000,
+            "upstream": upstream[name] / iterations,
+        }
+        for name, values in timings.items()
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float,
+    min_delta: float,
+) -> int:
+    """
+    Print results next to a baseline run.
+
+    An endpoint regresses when its median grows by more than tolerance and
+    min_delta milliseconds, or when it makes more upstream requests per call.
+
+    :param Dict results: Current results.
+    :param Dict baseline: Baseline results.
+    :param float tolerance: Allowed relative median growth, e.g. 0.2.
+    :param float min_delta: Allowed absolute median growth in milliseconds.
+    :return: Number of regressions.
+    """
+
+    regressions = 0
+    print(
+        f"{'endpoint':<22}{'median ms':>11}{'baseline':>11}{'change':>9}{'upstream':>10}"
+    )
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<22}{result['median_ms']:>11.2f}{'-':>11}")
+            continue
+
+        change = result["median_ms"] / base["median_ms"] - 1 if base["median_ms"] else 0
+        regressed = (
+            change > tolerance and result["median_ms"] - base["median_ms"] > min_delta
+        ) or result["upstream"] > base["upstream"]
+        regressions += regressed
+        print(
+            f"{name:<22}{result['median_ms']:>11.2f}{base['median_ms']:>11.2f}"
+            f"{change:>+9.1%}{result['upstream']:>6.1f}/{base['upstream']:<3.1f}"
+            f"{'  REGRESSION' if regressed else ''}"
+        )
+
+    return regressions
+
+
+def main():
+    """
+    Benchmark entry point.
+    """
+
+    parser = argparse.ArgumentParser(
+        description="End-to-end latency of every API endpoint against a fake magtifun.ge."
+    )
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Upstream latency in seconds."
+    )
+    parser.add_argument("--cold", action="store_true", help="Disable all caches.")
+    parser.add_argument("--output", type=Path, help="Write results as JSON.")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON to compare with.")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="Allowed median slowdown."
+    )
+    parser.add_argument(
+        "--min-delta",
+        type=float,
+        default=1.0,
+        help="Median slowdown in milliseconds always allowed.",
+    )
+    args = parser.parse_args()
+
+    os.environ["MAGTIFUN_BASE_URL"] = serve_in_process(latency=args.latency)
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("SMS_RATE_PER_KEY", "0")
+    os.environ.setdefault("SMS_RATE_GLOBAL", "0")
+    if args.cold:
+        os.environ.update(COLD_SETTINGS)
+
+    results = asyncio.run(run(args.iterations, args.warmup))
+
+    if args.output:
+        args.output.write_text(
+            json.dumps(
+                {
+                    "commit": _commit(),
+                    "python": platform.python_version(),
+                    "latency": args.latency,
+                    "cold": args.cold,
+                    "results": results,
+                },
+                indent=2,
+            )
+        )
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        print(f"baseline: {baseline['commit']}")
+        sys.exit(
+            1
+            if compare(results, baseline["results"], args.tolerance, args.min_delta)
+            else 0
+        )
+
+    print(f"{'endpoint':<22}{'median ms':>11}{'p95 ms':>9}{'upstream':>10}")
+    for name, result in results.items():
+        print(
+            f"{name:<22}{result['median_ms']:>11.2f}{result['p95_ms']:>9.2f}"
+            f"{result['upstream']:>10.1f}"
+        )
+
+
+def _auth_headers() -> Dict[str, str]:
+    # pylint: disable=C0415
+    from datetime import timedelta
+
+    from app.services.jwt import create_access_token
+
+    token = create_access_token({"sub": VALID_KEY}, timedelta(minutes=30))
+
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def _call(
+    client: httpx.AsyncClient, endpoint: Endpoint, headers: Dict[str, str]
+) -> Tuple[float, int]:
+    from app.services.http import get_pool_stats  # pylint: disable=C0415
+
+    requests = get_pool_stats().requests
+    started = time.perf_counter()
+    response = await client.request(
+        endpoint.method,
+        endpoint.path,
+        headers=headers,
+        json=endpoint.json,
+        data=endpoint.data,
+    )
+    elapsed = time.perf_counter() - started
+    response.raise_for_status()
+
+    return elapsed, get_pool_stats().requests - requests
+
+
+def _percentile(values: List[float], share: float) -> float:
+    values = sorted(values)
+
+    return values[max(int(len(values) * share) - 1, 0)]
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    main()
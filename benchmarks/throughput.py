@@ -0,0 +1,110 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from collections import Counter
+from typing import List, Tuple
+
+import httpx
+
+from benchmarks.fake_magtifun import VALID_KEY, Faults, serve_in_process
+
+
+async def run(endpoint: str, requests: int, concurrency: int) -> None:
+    """
+    Fire requests against the API and print throughput and latency percentiles.
+
+    :param str endpoint: API endpoint to call.
+    :param int requests: Total request count.
+    :param int concurrency: Requests kept in flight at once.
+    """
+
+    # pylint: disable=C0415
+    from datetime import timedelta
+
+    from app.main import app
+    from app.services.http import get_pool_stats
+    from app.services.jwt import create_access_token
+
+    token = create_access_token({"sub": VALID_KEY}, timedelta(minutes=5))
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://api",
+        headers={"Authorization": f"Bearer {token}"},
+    ) as client:
+        elapsed, latencies, statuses = await _fire(
+            client, endpoint, requests, concurrency
+        )
+
+    print(f"endpoint:    {endpoint}")
+    print(f"requests:    {requests} (concurrency {concurrency})")
+    print(f"throughput:  {requests / elapsed:.1f} req/s")
+    print(f"latency p50: {statistics.median(latencies) * 1000:.1f} ms")
+    print(f"latency p99: {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+    print(f"statuses:    {dict(sorted(statuses.items()))}")
+    print(f"pool:        {get_pool_stats()}")
+
+
+async def _fire(
+    client: httpx.AsyncClient, endpoint: str, requests: int, concurrency: int
+) -> Tuple[float, List[float], Counter]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = Counter()
+
+    async def call():
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(endpoint)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(requests)))
+
+    return time.perf_counter() - started, sorted(latencies), statuses
+
+
+def main():
+    """
+    Benchmark entry point.
+    """
+
+    parser = argparse.ArgumentParser(
+        description="API throughput against a local fake magtifun.ge."
+    )
+    parser.add_argument("--endpoint", default="/balance/")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument(
+        "--latency", type=float, default=0.1, help="Upstream latency in seconds."
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Share of upstream 500s."
+    )
+    parser.add_argument(
+        "--stall-rate", type=float, default=0.0, help="Share of stalled upstream calls."
+    )
+    args = parser.parse_args()
+
+    os.environ["MAGTIFUN_BASE_URL"] = serve_in_process(
+        latency=args.latency,
+        faults=Faults(error_rate=args.error_rate, stall_rate=args.stall_rate),
+    )
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+
+    asyncio.run(run(args.endpoint, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+import os
+
+# app.core.config reads the environment on import.
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ["CACHE_URL"] = ""
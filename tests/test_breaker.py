@@ -0,0 +1,90 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import breaker
+from app.core.breaker import CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(breaker, "time", SimpleNamespace(monotonic=lambda: clock.now))
+
+    return clock
+
+
+def test_opens_after_threshold_consecutive_failures(clock):
+    circuit = CircuitBreaker(threshold=3, reset_timeout=10)
+    circuit.failure()
+    circuit.failure()
+    assert circuit.retry_after() == 0
+
+    circuit.failure()
+    assert circuit.retry_after() == 10
+
+    clock.now += 4
+    assert circuit.retry_after() == 6
+
+
+def test_success_resets_failure_count(clock):
+    circuit = CircuitBreaker(threshold=2, reset_timeout=10)
+    circuit.failure()
+    circuit.success()
+    circuit.failure()
+
+    assert circuit.retry_after() == 0
+
+
+def test_lets_one_trial_through_after_reset_timeout(clock):
+    circuit = CircuitBreaker(threshold=1, reset_timeout=10)
+    circuit.failure()
+
+    clock.now += 10
+    assert circuit.retry_after() == 0
+    # Calls made while the trial is in flight are still rejected.
+    assert circuit.retry_after() == 10
+
+
+def test_successful_trial_closes_circuit(clock):
+    circuit = CircuitBreaker(threshold=2, reset_timeout=10)
+    circuit.failure()
+    circuit.failure()
+
+    clock.now += 10
+    assert circuit.retry_after() == 0
+    circuit.success()
+
+    assert circuit.retry_after() == 0
+    circuit.failure()
+    assert circuit.retry_after() == 0
+
+
+def test_failed_trial_reopens_circuit(clock):
+    circuit = CircuitBreaker(threshold=5, reset_timeout=10)
+    for _ in range(5):
+        circuit.failure()
+
+    clock.now += 10
+    assert circuit.retry_after() == 0
+
+    clock.now += 1
+    circuit.failure()
+    assert circuit.retry_after() == 10
+
+
+def test_non_positive_threshold_disables_breaker(clock):
+    circuit = CircuitBreaker(threshold=0, reset_timeout=10)
+    for _ in range(100):
+        circuit.failure()
+
+    assert circuit.retry_after() == 0
@@ -0,0 +1,91 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+from datetime import date, datetime
+
+import pytest
+
+from app.services.dates import parse_compact_datetime, parse_datetime, parse_day
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("05 October 2021", date(2021, 10, 5)),
+        ("5 october 2021", date(2021, 10, 5)),
+        ("05Oct2021", date(2021, 10, 5)),
+        ("  29 February 2020 ", date(2020, 2, 29)),
+        ("31DEC1999", date(1999, 12, 31)),
+    ],
+)
+def test_parse_day(text, expected):
+    assert parse_day(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["", "05 Foo 2021", "05 October", "October 2021", "05-10-2021", "32 Oct 2021"],
+)
+def test_parse_day_invalid(text):
+    with pytest.raises(ValueError):
+        parse_day(text)
+
+
+def test_parse_day_invalid_leap_day():
+    with pytest.raises(ValueError):
+        parse_day("29 February 2021")
+
+
+@pytest.mark.parametrize(
+    "day, time, expected",
+    [
+        ("05 October 2021", "12:30:00", datetime(2021, 10, 5, 12, 30)),
+        ("05 October 2021", " 23:59:59 ", datetime(2021, 10, 5, 23, 59, 59)),
+        ("01Jan2022", "00:00:01", datetime(2022, 1, 1, 0, 0, 1)),
+    ],
+)
+def test_parse_datetime(day, time, expected):
+    assert parse_datetime(day, time) == expected
+
+
+@pytest.mark.parametrize(
+    "day, time",
+    [
+        ("05 October 2021", "12:30"),
+        ("05 October 2021", "12-30-00"),
+        ("05 October 2021", "25:00:00"),
+        ("05 October 2021", "12:30:00.5"),
+        ("05 Foo 2021", "12:30:00"),
+    ],
+)
+def test_parse_datetime_invalid(day, time):
+    with pytest.raises(ValueError):
+        parse_datetime(day, time)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("05Oct202112:30:00", datetime(2021, 10, 5, 12, 30)),
+        (" 31Dec202123:59:59\n", datetime(2021, 12, 31, 23, 59, 59)),
+    ],
+)
+def test_parse_compact_datetime(text, expected):
+    assert parse_compact_datetime(text) == expected
+
+
+@pytest.mark.parametrize("text", ["", "05Oct2021", "05Oct2021 12:30", "xx12:30:00"])
+def test_parse_compact_datetime_invalid(text):
+    with pytest.raises(ValueError):
+        parse_compact_datetime(text)
+
+
+def test_parsed_dates_match_strptime():
+    for text in ("05Oct202112:30:00", "09May202001:02:03"):
+        assert parse_compact_datetime(text) == datetime.strptime(text, "%d%b%Y%H:%M:%S")
@@ -0,0 +1,95 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import cache, ratelimit
+from app.core.ratelimit import MemoryTokenBucket, RedisTokenBucket, TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(ratelimit, "time", SimpleNamespace(monotonic=lambda: clock.now))
+
+    return clock
+
+
+def test_burst_is_free_then_tokens_are_reserved(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+
+    assert [bucket.take() for _ in range(3)] == [0, 0, 0]
+    assert bucket.delay() == 0.5
+    assert bucket.take() == 0.5
+    assert bucket.take() == 1.0
+
+
+def test_delay_does_not_take_a_token(clock):
+    bucket = TokenBucket(rate=1, capacity=1)
+
+    assert bucket.delay() == 0
+    assert bucket.delay() == 0
+    assert bucket.take() == 0
+    assert bucket.delay() == 1
+
+
+def test_tokens_refill_up_to_capacity(clock):
+    bucket = TokenBucket(rate=2, capacity=2)
+    bucket.take()
+    bucket.take()
+
+    clock.now += 0.5
+    assert bucket.take() == 0
+    assert bucket.delay() == 0.5
+
+    clock.now += 60
+    assert [bucket.take() for _ in range(3)] == [0, 0, 0.5]
+
+
+def test_non_positive_rate_disables_limiting(clock):
+    bucket = TokenBucket(rate=0, capacity=1)
+
+    assert [bucket.take() for _ in range(10)] == [0] * 10
+
+
+def test_memory_buckets_are_per_key(clock):
+    buckets = MemoryTokenBucket("test", rate=1, capacity=1, maxsize=10)
+
+    async def takes():
+        return [
+            await buckets.take("a"),
+            await buckets.take("b"),
+            await buckets.take("a"),
+        ]
+
+    assert asyncio.run(takes()) == [0, 0, 1]
+
+
+def test_redis_buckets_are_shared(monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_URL", "fakeredis://")
+    monkeypatch.setattr(cache, "_redis", None)
+    first = RedisTokenBucket("test", rate=10, capacity=2, maxsize=10)
+    second = RedisTokenBucket("test", rate=10, capacity=2, maxsize=10)
+
+    async def takes():
+        return [
+            await first.take("key"),
+            await second.take("key"),
+            await first.take("key"),
+            await second.take("other"),
+        ]
+
+    delays = asyncio.run(takes())
+
+    assert delays[:2] == [0, 0]
+    assert delays[2] == pytest.approx(0.1, abs=0.01)
+    assert delays[3] == 0
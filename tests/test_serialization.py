@@ -0,0 +1,77 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from app.core.serialization import dumps, loads
+from app.models.domain.history import BalanceHistoryRow, SMSHistoryRow
+from app.models.schemas.account import Account, Gender
+from app.models.schemas.balance import Balance
+
+ACCOUNT = Account(
+    first_name="John",
+    last_name="Doe",
+    username="john.doe",
+    phone="599123456",
+    city="თბილისი",
+    birthdate=datetime(1970, 1, 1),
+    gender=Gender.MALE,
+)
+BALANCE_ROW = BalanceHistoryRow(datetime(2021, 9, 1, 12, 30), "Top up", 500, False)
+SMS_ROW = SMSHistoryRow(
+    7, datetime(2021, 9, 2, 8, 15, 5), "599123456", "გამარჯობა", True
+)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        ACCOUNT,
+        ACCOUNT.copy(
+            update={"username": None, "birthdate": None, "gender": Gender.FEMALE}
+        ),
+        Balance(credit=50, amount=5),
+        BALANCE_ROW,
+        SMS_ROW,
+        [SMS_ROW, SMS_ROW._replace(id=6, delivered=False)],
+        [],
+        "token",
+        None,
+    ],
+)
+def test_round_trip(value):
+    result = loads(dumps(value))
+
+    assert result == value
+    assert type(result) is type(value)
+
+
+def test_round_trip_keeps_field_types():
+    account = loads(dumps(ACCOUNT))
+    sms, balance = loads(dumps([SMS_ROW, BALANCE_ROW]))
+
+    assert isinstance(account.birthdate, datetime)
+    assert account.gender is Gender.MALE
+    assert isinstance(sms, SMSHistoryRow) and isinstance(sms.date, datetime)
+    assert isinstance(balance, BalanceHistoryRow) and isinstance(balance.date, datetime)
+
+
+def test_tuples_come_back_as_lists():
+    assert loads(dumps(("token", [["PHPSESSID", "abc"]]))) == [
+        "token",
+        [["PHPSESSID", "abc"]],
+    ]
+
+
+def test_rows_are_stored_without_field_names():
+    assert dumps(SMS_ROW) == (
+        '{"s":[7,"2021-09-02T08:15:05","599123456","გამარჯობა",true]}'.encode("utf-8")
+    )
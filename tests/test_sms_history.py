@@ -0,0 +1,124 @@
+"""
+This file is part of the magtifun.abgeo.dev.
+
+(c) 2021 Temuri Takalandze <me@abgeo.dev>
+
+For the full copyright and license information, please view the LICENSE
+file that was distributed with this source code.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.domain.history import SMSHistoryRow
+from app.services.sms_history import SMSHistoryStore
+
+ACCOUNT = "account"
+NEWEST = datetime(2021, 10, 5, 12, 30)
+
+
+def row(sms_id: int, delivered: bool = True) -> SMSHistoryRow:
+    # IDs grow with time, one message per hour.
+    return SMSHistoryRow(
+        id=sms_id,
+        date=NEWEST - timedelta(hours=100 - sms_id),
+        recipient="599123456",
+        text=f"Message {sms_id}",
+        delivered=delivered,
+    )
+
+
+def history(*ids: int) -> list:
+    return [row(sms_id) for sms_id in sorted(ids, reverse=True)]
+
+
+def ids(rows) -> list:
+    return [item.id for item in rows]
+
+
+@pytest.fixture
+def store():
+    store = SMSHistoryStore(":memory:")
+    yield store
+    store.close()
+
+
+def test_full_merge_replaces_history_and_completes_account(store):
+    store.merge(ACCOUNT, history(1, 2, 3), full=True)
+    store.merge(ACCOUNT, history(2, 3, 4), full=True)
+
+    assert store.is_complete(ACCOUNT)
+    assert ids(store.query(ACCOUNT)) == [4, 3, 2]
+
+
+def test_incremental_merge_keeps_older_and_drops_deleted(store):
+    store.merge(ACCOUNT, history(1, 2, 3, 4, 5), full=True)
+
+    # The newest upstream page lists 6, 5 and 3 but no longer 4, which falls
+    # inside the fetched date range; 1 and 2 are older than the range.
+    store.merge(ACCOUNT, history(3, 5, 6), full=False)
+
+    assert ids(store.query(ACCOUNT)) == [6, 5, 3, 2, 1]
+
+
+def test_incremental_merge_overwrites_delivery_status(store):
+    store.merge(ACCOUNT, [row(2, delivered=False), row(1)], full=True)
+    store.merge(ACCOUNT, [row(2, delivered=True)], full=False)
+
+    assert store.query(ACCOUNT, limit=1)[0].delivered is True
+
+
+def test_empty_merge_clears_history(store):
+    store.merge(ACCOUNT, history(1, 2), full=True)
+    store.merge(ACCOUNT, [], full=False)
+
+    assert not store.query(ACCOUNT)
+
+
+def test_incremental_merge_does_not_complete_account(store):
+    store.merge(ACCOUNT, history(1, 2), full=False)
+
+    assert not store.is_complete(ACCOUNT)
+
+
+def test_accounts_are_separate(store):
+    store.merge(ACCOUNT, history(1, 2), full=True)
+    store.merge("other", history(3), full=True)
+
+    assert ids(store.query(ACCOUNT)) == [2, 1]
+    assert ids(store.query("other")) == [3]
+    assert store.contains_any(ACCOUNT, [2, 3])
+    assert not store.contains_any("other", [1, 2])
+    assert not store.contains_any(ACCOUNT, [])
+
+
+@pytest.mark.parametrize(
+    "limit, since, until, expected",
+    [
+        (None, None, None, [5, 4, 3, 2, 1]),
+        (2, None, None, [5, 4]),
+        (None, row(3).date, None, [5, 4, 3]),
+        (None, None, row(3).date, [3, 2, 1]),
+        (None, row(2).date, row(4).date, [4, 3, 2]),
+        (1, row(2).date, row(4).date, [4]),
+        (None, row(5).date + timedelta(seconds=1), None, []),
+    ],
+)
+def test_query_window(store, limit, since, until, expected):
+    store.merge(ACCOUNT, history(1, 2, 3, 4, 5), full=True)
+
+    assert ids(store.query(ACCOUNT, limit, since, until)) == expected
+
+
+def test_query_returns_rows(store):
+    store.merge(ACCOUNT, history(1), full=True)
+
+    assert store.query(ACCOUNT) == [row(1)]
+
+
+def test_delete(store):
+    store.merge(ACCOUNT, history(1, 2), full=True)
+    store.delete(ACCOUNT, 2)
+
+    assert ids(store.query(ACCOUNT)) == [1]